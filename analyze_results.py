@@ -1,50 +1,156 @@
-import json
 import os
-import glob
-from typing import List, Dict
-import pandas as pd
+import csv
+import statistics
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, List, Dict, Optional
+
+from src.utils.json_utils import loads
 
 def load_summary(file_path: str) -> Dict:
     """Load a summary JSON file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return loads(Path(file_path).read_bytes())
 
-def analyze_results(log_dir: str = "logs"):
-    """Analyze all experiment results in log directory."""
+def _try_load_summary(file_path: str) -> Optional[Dict]:
+    """Load a summary file, returning None (and reporting) on failure."""
+    try:
+        return load_summary(file_path)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return None
+
+# Flattened summary keys -> DataFrame columns
+SUMMARY_COLUMNS = {
+    "agent": "Agent",
+    "model": "Model",
+    "dataset": "Dataset",
+    "success_rate": "success_rate",
+    "successful_episodes": "Successes",
+    "total_episodes": "Total",
+    "avg_steps": "avg_steps",
+    "token_usage_avg_tokens_per_episode": "avg_tokens",
+    "token_usage_total_tokens": "total_tokens",
+    "experiment_name": "Experiment",
+}
+
+# Values used when a summary file lacks a field
+SUMMARY_DEFAULTS = {
+    "Agent": "unknown",
+    "Model": "unknown",
+    "Dataset": "unknown",
+    "success_rate": 0,
+    "Successes": 0,
+    "Total": 0,
+    "avg_steps": 0,
+    "avg_tokens": 0,
+    "total_tokens": 0,
+    "Experiment": "",
+}
+
+# Display names and formats for the numeric columns
+DISPLAY_COLUMNS = {
+    "success_rate": ("Success Rate", "{:.1%}"),
+    "avg_steps": ("Avg Steps", "{:.1f}"),
+    "avg_tokens": ("Avg Tokens/Episode", "{:.0f}"),
+    "total_tokens": ("Total Tokens", "{:,.0f}"),
+}
+
+# Below this many summary files the report is built with the standard
+# library; importing pandas costs more than formatting a small table
+PANDAS_MIN_FILES = 200
+
+# Numeric columns averaged in the per-agent comparison
+COMPARISON_COLUMNS = ["success_rate", "avg_steps", "avg_tokens"]
+
+def _flatten(d: Dict, prefix: str = "") -> Dict[str, Any]:
+    """Flatten nested dicts with "_"-joined keys (like pd.json_normalize)."""
+    flat = {}
+    for key, value in d.items():
+        key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{key}_"))
+        else:
+            flat[key] = value
+    return flat
+
+def _format_value(col: str, value: Any) -> str:
+    """Format a cell for display."""
+    if col in DISPLAY_COLUMNS:
+        return DISPLAY_COLUMNS[col][1].format(value)
+    return str(value)
+
+def _print_rows(rows: List[Dict], columns: List[str]):
+    """Print rows as a right-aligned text table."""
+    headers = [DISPLAY_COLUMNS[col][0] if col in DISPLAY_COLUMNS else col for col in columns]
+    cells = [[_format_value(col, row[col]) for col in columns] for row in rows]
+    widths = [max([len(h)] + [len(r[i]) for r in cells]) for i, h in enumerate(headers)]
+    print(" ".join(h.rjust(w) for h, w in zip(headers, widths)))
+    for r in cells:
+        print(" ".join(c.rjust(w) for c, w in zip(r, widths)))
+
+def _report_stdlib(summaries: List[Dict], log_dir: str):
+    """Print the tables and write the CSV using only the standard library."""
+    rows = []
+    for summary in summaries:
+        flat = _flatten(summary)
+        row = {}
+        for key, col in SUMMARY_COLUMNS.items():
+            value = flat.get(key)
+            row[col] = SUMMARY_DEFAULTS[col] if value is None else value
+        rows.append(row)
     
-    # Find all summary files
-    summary_files = glob.glob(os.path.join(log_dir, "*_summary.json"))
+    # Sort by agent and model
+    rows.sort(key=lambda r: (r["Model"], r["Agent"]))
+    columns = list(SUMMARY_COLUMNS.values())
     
-    if not summary_files:
-        print(f"No summary files found in {log_dir}")
-        return
+    # Print results
+    print("\n" + "="*100)
+    print("EXPERIMENT RESULTS SUMMARY")
+    print("="*100)
+    _print_rows(rows, columns)
+    print("="*100)
     
-    # Load all summaries
-    results = []
-    for file_path in summary_files:
-        try:
-            summary = load_summary(file_path)
-            results.append({
-                "Agent": summary.get("agent", "unknown"),
-                "Model": summary.get("model", "unknown"),
-                "Dataset": summary.get("dataset", "unknown"),
-                "Success Rate": f"{summary.get('success_rate', 0):.1%}",
-                "Successes": summary.get("successful_episodes", 0),
-                "Total": summary.get("total_episodes", 0),
-                "Avg Steps": f"{summary.get('avg_steps', 0):.1f}",
-                "Avg Tokens/Episode": f"{summary.get('token_usage', {}).get('avg_tokens_per_episode', 0):.0f}",
-                "Total Tokens": f"{summary.get('token_usage', {}).get('total_tokens', 0):,}",
-                "Experiment": summary.get("experiment_name", "")
-            })
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-    
-    if not results:
-        print("No valid results found")
-        return
+    # Group by agent for comparison
+    print("\n" + "="*100)
+    print("COMPARISON BY AGENT (Average across models)")
+    print("="*100)
     
-    # Create DataFrame
-    df = pd.DataFrame(results)
+    by_agent = defaultdict(list)
+    for row in rows:
+        by_agent[row["Agent"]].append(row)
+    agent_comparison = [
+        {"Agent": agent, **{col: statistics.mean(r[col] for r in group) for col in COMPARISON_COLUMNS}}
+        for agent, group in by_agent.items()
+    ]
+    _print_rows(agent_comparison, ["Agent"] + COMPARISON_COLUMNS)
+    print("="*100)
+    
+    # Save to CSV
+    output_file = os.path.join(log_dir, "results_summary.csv")
+    with open(output_file, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nResults saved to: {output_file}")
+
+def _report_pandas(summaries: List[Dict], log_dir: str):
+    """Print the tables and write the CSV with pandas (large result sets)."""
+    import pandas as pd
+    
+    def _format_table(df: pd.DataFrame) -> pd.DataFrame:
+        """Return a copy of df with numeric columns formatted for display."""
+        df_disp = df.copy()
+        for col, (name, fmt) in DISPLAY_COLUMNS.items():
+            if col in df_disp.columns:
+                df_disp[col] = df_disp[col].map(fmt.format)
+        return df_disp.rename(columns={col: name for col, (name, _) in DISPLAY_COLUMNS.items()})
+    
+    # Flatten nested token_usage in one pass; numeric fields stay numeric
+    # and formatting happens at print time
+    df = pd.json_normalize(summaries, sep="_")
+    df = df.reindex(columns=list(SUMMARY_COLUMNS)).rename(columns=SUMMARY_COLUMNS)
+    df = df.fillna(SUMMARY_DEFAULTS)
     
     # Sort by agent and model
     df = df.sort_values(["Model", "Agent"])
@@ -53,7 +159,7 @@ def analyze_results(log_dir: str = "logs"):
     print("\n" + "="*100)
     print("EXPERIMENT RESULTS SUMMARY")
     print("="*100)
-    print(df.to_string(index=False))
+    print(_format_table(df).to_string(index=False))
     print("="*100)
     
     # Group by agent for comparison
@@ -61,12 +167,8 @@ def analyze_results(log_dir: str = "logs"):
     print("COMPARISON BY AGENT (Average across models)")
     print("="*100)
     
-    agent_comparison = df.groupby("Agent").agg({
-        "Success Rate": lambda x: x.iloc[0],  # Already formatted
-        "Avg Steps": lambda x: x.iloc[0],
-        "Avg Tokens/Episode": lambda x: x.iloc[0]
-    })
-    print(agent_comparison.to_string())
+    agent_comparison = df.groupby("Agent", sort=False)[COMPARISON_COLUMNS].mean()
+    print(_format_table(agent_comparison).to_string())
     print("="*100)
     
     # Save to CSV
@@ -74,6 +176,33 @@ def analyze_results(log_dir: str = "logs"):
     df.to_csv(output_file, index=False)
     print(f"\nResults saved to: {output_file}")
 
+def analyze_results(log_dir: str = "logs"):
+    """Analyze all experiment results in log directory."""
+    
+    # Find all summary files
+    try:
+        with os.scandir(log_dir) as entries:
+            summary_files = [e.path for e in entries if e.name.endswith("_summary.json") and e.is_file()]
+    except FileNotFoundError:
+        summary_files = []
+    
+    if not summary_files:
+        print(f"No summary files found in {log_dir}")
+        return
+    
+    # Load all summaries; file reads overlap on a thread pool
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        summaries = [s for s in ex.map(_try_load_summary, summary_files) if s is not None]
+    
+    if not summaries:
+        print("No valid results found")
+        return
+    
+    if len(summary_files) < PANDAS_MIN_FILES:
+        _report_stdlib(summaries, log_dir)
+    else:
+        _report_pandas(summaries, log_dir)
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Analyze ZipAct experiment results")
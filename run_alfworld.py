@@ -18,98 +18,20 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 from src.envs.alfworld_env import ALFWorldEnv
 from src.llm.client import LLMClient
 from src.agents import get_agent
-from src.agents.reflexion import ReflexionAgent
 from src.utils.logger import Logger
-
-
-def run_episode(agent, env, max_steps=50, logger=None, episode_id=None, verbose=False):
-    """Run a single episode."""
-    obs, info = env.reset()
-    task = env.get_task()
-    
-    if verbose:
-        print(f"\n{'='*60}")
-        print(f"EPISODE {episode_id if episode_id is not None else '?'}")
-        print(f"Task: {task}")
-        print(f"{'='*60}")
-    
-    # Initialize agent
-    agent.reset(task)
-    
-    # Start logging
-    if logger:
-        logger.start_episode(task, episode_id)
-    
-    success = False
-    total_reward = 0
-    step = 0
-    
-    for step in range(max_steps):
-        if verbose:
-            print(f"\n--- Step {step + 1} ---")
-            print(f"Obs: {obs[:200]}...")  # Truncate long observations
-        
-        # Agent decides action
-        action = agent.step(obs)
-        
-        # Get thought for logging
-        thought = agent.get_last_thought() if hasattr(agent, 'get_last_thought') else ""
-        
-        # Log step
-        if logger:
-            state = agent.get_state() if hasattr(agent, 'get_state') else None
-            logger.log_step(step + 1, obs, thought, action, state)
-        
-        if verbose:
-            print(f"Action: {action}")
-        
-        # Execute action
-        obs, reward, done, info = env.step(action)
-        total_reward += reward
-        
-        if done:
-            success = reward > 0
-            if verbose:
-                print(f"\n{'='*60}")
-                print(f"Episode finished: {'SUCCESS' if success else 'FAILURE'}")
-                print(f"Reward: {reward}")
-                print(f"Steps: {step + 1}")
-                print(f"{'='*60}")
-            break
-    
-    # Handle Reflexion agent reflection
-    if isinstance(agent, ReflexionAgent) and not success:
-        agent.reflect(success, failure_reason="Max steps reached" if step == max_steps - 1 else "Task failed")
-    
-    return success, total_reward, step + 1
+from src.runner import run_episodes
+from src.cli import agent_kwargs, check_args, common_parser
 
 
 def main():
-    parser = argparse.ArgumentParser(description="Run ZipAct experiments on ALFWorld")
-    parser.add_argument("--agent", type=str, default="zipact", 
-                       choices=["zipact", "react", "reflexion", "obs_mask", "summary"],
-                       help="Agent type to use")
-    parser.add_argument("--model", type=str, default="gpt-4o-mini",
-                       help="LLM model name (e.g., gpt-4o, gpt-4o-mini, qwen2.5-7b-instruct)")
-    parser.add_argument("--episodes", type=int, default=5,
-                       help="Number of episodes to run")
-    parser.add_argument("--max_steps", type=int, default=50,
-                       help="Maximum steps per episode")
+    parser = argparse.ArgumentParser(description="Run ZipAct experiments on ALFWorld",
+                                     parents=[common_parser()])
     parser.add_argument("--split", type=str, default="eval_out_of_distribution",
                        choices=["train", "eval_in_distribution", "eval_out_of_distribution"],
                        help="Dataset split to use")
-    parser.add_argument("--log_dir", type=str, default="logs",
-                       help="Directory to save logs")
-    parser.add_argument("--verbose", action="store_true",
-                       help="Print detailed execution logs")
-    parser.add_argument("--verbose-tokens", action="store_true",
-                       help="Print detailed token usage for each LLM call")
-    parser.add_argument("--api_key", type=str, default=None,
-                       help="OpenAI API key (or set OPENAI_API_KEY env variable)")
-    parser.add_argument("--base_url", type=str, default=None,
-                       help="OpenAI API base URL (for compatible endpoints)")
     
     args = parser.parse_args()
+    check_args(parser, args)
     
     # Check API key
     if args.api_key:
@@ -119,19 +41,28 @@ def main():
         print("Error: OPENAI_API_KEY not set. Please set it via --api_key or environment variable.")
         sys.exit(1)
     
-    # Initialize LLM
+    # Initialize LLM clients and agents (one per worker, so token usage stays per-episode)
     print(f"\nInitializing LLM: {args.model}")
-    llm = LLMClient(model=args.model, base_url=args.base_url, verbose=args.verbose_tokens)
-    
-    # Initialize agent with environment type
     print(f"Initializing agent: {args.agent}")
     environment = "alfworld"
-    agent = get_agent(args.agent, llm, environment=environment, verbose=args.verbose)
+    agents = [
+        get_agent(
+            args.agent,
+            LLMClient(model=args.model, base_url=args.base_url, verbose=args.verbose_tokens, prompt_cache=args.prompt_cache),
+            environment=environment,
+            **agent_kwargs(args)
+        )
+        for _ in range(args.concurrency)
+    ]
     
-    # Initialize environment
+    # Initialize environments
     print(f"Initializing ALFWorld environment (split: {args.split})")
     try:
-        env = ALFWorldEnv(split=args.split)
+        # One share of the games per worker, so workers never replay a game
+        envs = [
+            ALFWorldEnv(split=args.split, shard=shard, num_shards=args.concurrency)
+            for shard in range(args.concurrency)
+        ]
     except Exception as e:
         print(f"Failed to initialize ALFWorld: {e}")
         print("\nMake sure ALFWorld is properly installed:")
@@ -147,29 +78,19 @@ def main():
     print(f"\nRunning {args.episodes} episodes...")
     print(f"{'='*60}\n")
     
-    successes = []
-    
-    for i in range(args.episodes):
-        success, reward, steps = run_episode(
-            agent, env, 
-            max_steps=args.max_steps,
-            logger=logger,
-            episode_id=i + 1,
-            verbose=args.verbose
-        )
-        
-        successes.append(success)
-        
-        # Get token usage
-        token_usage = llm.get_token_usage()
-        logger.end_episode(success, reward, token_usage)
-        
-        # Reset token counter for next episode
-        llm.reset_token_count()
-        
-        # Print progress
+    def report(episode_id, success, reward, steps, token_usage):
         if not args.verbose:
-            print(f"Episode {i+1}/{args.episodes}: {'✓ SUCCESS' if success else '✗ FAILURE'} (Steps: {steps}, Tokens: {token_usage['total_tokens']:,})")
+            print(f"Episode {episode_id}/{args.episodes}: {'✓ SUCCESS' if success else '✗ FAILURE'} (Steps: {steps}, Tokens: {token_usage['total_tokens']:,})")
+    
+    run_episodes(
+        agents, envs, args.episodes,
+        max_steps=args.max_steps,
+        logger=logger,
+        verbose=args.verbose,
+        on_result=report,
+        warm_prefix=args.warm_prefix
+    )
+    logger.close()
     
     # Print summary
     summary = logger.save_summary(
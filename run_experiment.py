@@ -10,25 +10,28 @@ from datetime import datetime
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 from src.llm.client import LLMClient
-from src.agents.zipact import ZipActAgent
-from src.agents.react import ReActAgent
-from src.agents.reflexion import ReflexionAgent
-from src.agents.observation_masking import ObservationMaskingAgent
-from src.agents.summary import SummaryAgent
+from src.agents import get_agent
 from src.utils.logger import Logger
+from src.runner import run_episodes
+from src.cli import add_sciworld_args, agent_kwargs, check_args, common_parser
 
 
 def get_environment(dataset: str, **kwargs):
     """Initialize environment based on dataset name."""
     if dataset == "alfworld":
         from src.envs.alfworld_env import ALFWorldEnv
-        return ALFWorldEnv(split=kwargs.get('split', 'eval_out_of_distribution'))
+        return ALFWorldEnv(
+            split=kwargs.get('split', 'eval_out_of_distribution'),
+            shard=kwargs.get('shard', 0),
+            num_shards=kwargs.get('num_shards', 1)
+        )
     
     elif dataset == "sciworld":
         from src.envs.sciworld_env import SciWorldEnv
         return SciWorldEnv(
             task_name=kwargs.get('task_name', 'boil'),
-            simplifications_preset=kwargs.get('difficulty', 'easy')
+            simplifications_preset=kwargs.get('difficulty', 'easy'),
+            step_cache_size=kwargs.get('step_cache_size', 0)
         )
     
     elif dataset == "webshop":
@@ -39,99 +42,9 @@ def get_environment(dataset: str, **kwargs):
         raise ValueError(f"Unknown dataset: {dataset}")
 
 
-def get_agent(agent_type: str, llm_client: LLMClient, environment: str = "alfworld", verbose: bool = False):
-    """Initialize agent based on type.
-    
-    Args:
-        agent_type: Agent type name
-        llm_client: LLM client instance
-        environment: Environment type ('alfworld', 'sciworld', 'webshop')
-        verbose: Whether to print debug info
-    """
-    if agent_type == "zipact":
-        return ZipActAgent(llm_client, environment=environment, verbose=verbose)
-    elif agent_type == "react":
-        return ReActAgent(llm_client, environment=environment, verbose=verbose)
-    elif agent_type == "reflexion":
-        return ReflexionAgent(llm_client, environment=environment, verbose=verbose)
-    elif agent_type == "obs_mask":
-        return ObservationMaskingAgent(llm_client, environment=environment, keep_recent=5, verbose=verbose)
-    elif agent_type == "summary":
-        return SummaryAgent(llm_client, environment=environment, summary_interval=10, verbose=verbose)
-    else:
-        raise ValueError(f"Unknown agent type: {agent_type}")
-
-
-def run_episode(agent, env, max_steps=50, logger=None, episode_id=None, verbose=False):
-    """Run a single episode."""
-    obs, info = env.reset()
-    task = env.get_task()
-    
-    if verbose:
-        print(f"\n{'='*60}")
-        print(f"EPISODE {episode_id if episode_id is not None else '?'}")
-        print(f"Task: {task}")
-        print(f"{'='*60}")
-    
-    # Initialize agent
-    agent.reset(task)
-    
-    # Start logging
-    if logger:
-        logger.start_episode(task, episode_id)
-    
-    success = False
-    total_reward = 0
-    
-    for step in range(max_steps):
-        if verbose:
-            print(f"\n--- Step {step + 1} ---")
-            print(f"Obs: {obs[:200]}...")
-        
-        # Agent decides action
-        action = agent.step(obs)
-        
-        # Get thought for logging
-        thought = agent.get_last_thought() if hasattr(agent, 'get_last_thought') else ""
-        
-        # Log step
-        if logger:
-            state = agent.get_state() if hasattr(agent, 'get_state') else None
-            logger.log_step(step + 1, obs, thought, action, state)
-        
-        if verbose:
-            print(f"Action: {action}")
-        
-        # Execute action
-        obs, reward, done, info = env.step(action)
-        total_reward += reward
-        
-        if done:
-            success = reward > 0
-            if verbose:
-                print(f"\n{'='*60}")
-                print(f"Episode finished: {'SUCCESS' if success else 'FAILURE'}")
-                print(f"Reward: {reward}")
-                print(f"Steps: {step + 1}")
-                print(f"{'='*60}")
-            break
-    
-    # Handle Reflexion agent reflection
-    if isinstance(agent, ReflexionAgent) and not success:
-        agent.reflect(success, failure_reason="Max steps reached" if step == max_steps - 1 else "Task failed")
-    
-    return success, total_reward, step + 1
-
-
 def main():
-    parser = argparse.ArgumentParser(description="Run ZipAct experiments on multiple datasets")
-    
-    # Agent and model
-    parser.add_argument("--agent", type=str, default="zipact",
-                       choices=["zipact", "react", "reflexion", "obs_mask", "summary"],
-                       help="Agent type to use")
-    parser.add_argument("--model", type=str, default="gpt-4o-mini",
-                       help="LLM model name")
+    parser = argparse.ArgumentParser(description="Run ZipAct experiments on multiple datasets",
+                                     parents=[common_parser()])
     
     # Dataset
     parser.add_argument("--dataset", type=str, default="alfworld",
@@ -146,26 +59,10 @@ def main():
     parser.add_argument("--difficulty", type=str, default="easy",
                        choices=["easy", "medium", "hard"],
                        help="Difficulty level (SciWorld)")
-    
-    # Experiment settings
-    parser.add_argument("--episodes", type=int, default=5,
-                       help="Number of episodes to run")
-    parser.add_argument("--max_steps", type=int, default=50,
-                       help="Maximum steps per episode")
-    parser.add_argument("--log_dir", type=str, default="logs",
-                       help="Directory to save logs")
-    parser.add_argument("--verbose", action="store_true",
-                       help="Print detailed execution logs")
-    parser.add_argument("--verbose-tokens", action="store_true",
-                       help="Print detailed token usage for each LLM call")
-    
-    # API settings
-    parser.add_argument("--api_key", type=str, default=None,
-                       help="OpenAI API key")
-    parser.add_argument("--base_url", type=str, default=None,
-                       help="OpenAI API base URL")
+    add_sciworld_args(parser)
     
     args = parser.parse_args()
+    check_args(parser, args)
     
     # Set API key
     if args.api_key:
@@ -175,23 +72,33 @@ def main():
         print("Error: OPENAI_API_KEY not set.")
         sys.exit(1)
     
-    # Initialize LLM
+    # Initialize LLM clients and agents (one per worker, so token usage stays per-episode)
     print(f"\nInitializing LLM: {args.model}")
-    llm = LLMClient(model=args.model, base_url=args.base_url, verbose=args.verbose_tokens)
-    
-    # Initialize agent with environment parameter
     print(f"Initializing agent: {args.agent}")
-    agent = get_agent(args.agent, llm, environment=args.dataset, verbose=args.verbose)
+    agents = [
+        get_agent(
+            args.agent,
+            LLMClient(model=args.model, base_url=args.base_url, verbose=args.verbose_tokens, prompt_cache=args.prompt_cache),
+            environment=args.dataset,
+            **agent_kwargs(args)
+        )
+        for _ in range(args.concurrency)
+    ]
     
-    # Initialize environment
+    # Initialize environments
     print(f"Initializing {args.dataset} environment")
     try:
         env_kwargs = {
             'split': args.split,
             'task_name': args.task_name,
-            'difficulty': args.difficulty
+            'difficulty': args.difficulty,
+            'step_cache_size': args.step_cache_size
         }
-        env = get_environment(args.dataset, **env_kwargs)
+        # One share of the ALFWorld games per worker, so workers never replay a game
+        envs = [
+            get_environment(args.dataset, shard=shard, num_shards=args.concurrency, **env_kwargs)
+            for shard in range(args.concurrency)
+        ]
     except Exception as e:
         print(f"Failed to initialize {args.dataset}: {e}")
         sys.exit(1)
@@ -204,27 +111,21 @@ def main():
     print(f"\nRunning {args.episodes} episodes on {args.dataset}...")
     print(f"{'='*60}\n")
     
-    for i in range(args.episodes):
-        success, reward, steps = run_episode(
-            agent, env,
-            max_steps=args.max_steps,
-            logger=logger,
-            episode_id=i + 1,
-            verbose=args.verbose
-        )
-        
-        # Get token usage
-        token_usage = llm.get_token_usage()
-        logger.end_episode(success, reward, token_usage)
-        
-        # Reset token counter
-        llm.reset_token_count()
-        
-        # Print progress
+    def report(episode_id, success, reward, steps, token_usage):
         if not args.verbose:
-            print(f"Episode {i+1}/{args.episodes}: {'✓ SUCCESS' if success else '✗ FAILURE'} "
+            print(f"Episode {episode_id}/{args.episodes}: {'✓ SUCCESS' if success else '✗ FAILURE'} "
                   f"(Steps: {steps}, Reward: {reward:.2f}, Tokens: {token_usage['total_tokens']:,})")
     
+    run_episodes(
+        agents, envs, args.episodes,
+        max_steps=args.max_steps,
+        logger=logger,
+        verbose=args.verbose,
+        on_result=report,
+        warm_prefix=args.warm_prefix
+    )
+    logger.close()
+    
     # Print summary
     summary = logger.save_summary(
         agent_name=args.agent,
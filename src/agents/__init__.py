@@ -9,12 +9,19 @@ Agents:
 - SummaryAgent: ReAct with periodic summarization
 """
 
+import importlib
+
 from .base import BaseAgent
-from .zipact import ZipActAgent
-from .react import ReActAgent
-from .reflexion import ReflexionAgent
-from .observation_masking import ObservationMaskingAgent
-from .summary import SummaryAgent
+
+# Agent classes are imported on first use (PEP 562), so running one agent
+# does not load the other agents' modules
+_AGENT_MODULES = {
+    "ZipActAgent": ".zipact",
+    "ReActAgent": ".react",
+    "ReflexionAgent": ".reflexion",
+    "ObservationMaskingAgent": ".observation_masking",
+    "SummaryAgent": ".summary",
+}
 
 __all__ = [
     "BaseAgent",
@@ -26,6 +33,28 @@ __all__ = [
 ]
 
 
+# Default values for agent-specific options, keyed by class name. These
+# options are only forwarded to the agents listed here.
+_AGENT_KWARGS = {
+    "ZipActAgent": {
+        "plan_cache": None, "compact_state": False, "overlap_updates": False, "structured_actions": False,
+        "guided_actions": False, "updater_model": None, "combined_step": False,
+        "max_attempted_actions": None, "actor_examples": None, "json_state": False,
+        "action_first": False,
+    },
+    "ObservationMaskingAgent": {"keep_recent": 5, "token_budget": None},
+    "SummaryAgent": {"summary_interval": 10, "token_budget": None, "compaction": False},
+}
+_AGENT_OPTIONS = {key for defaults in _AGENT_KWARGS.values() for key in defaults}
+
+
+def __getattr__(name: str):
+    if name in _AGENT_MODULES:
+        module = importlib.import_module(_AGENT_MODULES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def get_agent(agent_name: str, llm_client, environment: str = "alfworld", **kwargs):
     """
     Factory function to get agent by name.
@@ -40,12 +69,12 @@ def get_agent(agent_name: str, llm_client, environment: str = "alfworld", **kwar
         Agent instance
     """
     agent_map = {
-        'zipact': ZipActAgent,
-        'react': ReActAgent,
-        'reflexion': ReflexionAgent,
-        'obs_mask': ObservationMaskingAgent,
-        'observation_masking': ObservationMaskingAgent,
-        'summary': SummaryAgent,
+        'zipact': "ZipActAgent",
+        'react': "ReActAgent",
+        'reflexion': "ReflexionAgent",
+        'obs_mask': "ObservationMaskingAgent",
+        'observation_masking': "ObservationMaskingAgent",
+        'summary': "SummaryAgent",
     }
     
     agent_lower = agent_name.lower()
@@ -55,7 +84,13 @@ def get_agent(agent_name: str, llm_client, environment: str = "alfworld", **kwar
             f"Supported: {list(agent_map.keys())}"
         )
     
-    AgentClass = agent_map[agent_lower]
+    class_name = agent_map[agent_lower]
+    AgentClass = __getattr__(class_name)
+    
+    # Drop options the class does not take, then fill in its defaults
+    defaults = _AGENT_KWARGS.get(class_name, {})
+    kwargs = {k: v for k, v in kwargs.items() if k not in _AGENT_OPTIONS or k in defaults}
+    merged = {**defaults, **kwargs}
     
     # All agents now support environment parameter
-    return AgentClass(llm_client, environment=environment, **kwargs)
+    return AgentClass(llm_client, environment=environment, **merged)
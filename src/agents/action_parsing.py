@@ -0,0 +1,116 @@
+"""
+Fallback action extraction for LLM responses without an "Action:" line.
+
+Each environment has a finder: a callable taking the response text and
+returning the first action-like command in it (None if there is none).
+ALFWorld and SciWorld actions start with one of a fixed set of verbs; when
+pyahocorasick is installed those are found with an Aho-Corasick automaton
+in one linear pass, otherwise with the equivalent compiled regex. WebShop
+actions (search[...], click[...], back) always use a regex.
+"""
+
+import re
+from typing import Callable, Dict, Optional, Sequence
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Action verbs per environment (alternation order matches the regexes)
+ACTION_VERBS = {
+    "sciworld": (
+        "look around", "go to", "pick up", "put down", "put", "pour", "open", "close",
+        "activate", "deactivate", "focus on", "wait", "mix", "connect", "use", "read", "examine",
+    ),
+    "alfworld": (
+        "go to", "take", "put", "open", "close", "clean", "heat", "cool", "toggle", "use",
+        "look", "inventory",
+    ),
+}
+
+
+# "Thought: ..." / "Action: ..." lines (leading whitespace allowed)
+THOUGHT_ACTION_RE = re.compile(r'^\s*(Thought|Action):(.*)$', re.MULTILINE)
+
+
+def _verb_pattern(verbs: Sequence[str]) -> "re.Pattern":
+    """A verb at a word boundary followed by the rest of its line."""
+    return re.compile(r'\b(' + '|'.join(verbs) + r')\b.+', re.IGNORECASE)
+
+
+ACTION_PATTERNS = {
+    "webshop": re.compile(r'(search\[.+?\]|click\[.+?\]|back)', re.IGNORECASE),
+    **{env: _verb_pattern(verbs) for env, verbs in ACTION_VERBS.items()},
+}
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _regex_finder(pattern: "re.Pattern") -> Callable[[str], Optional[str]]:
+    def find(text: str) -> Optional[str]:
+        match = pattern.search(text)
+        return match.group(0).strip() if match else None
+    return find
+
+
+class _VerbScanner:
+    """
+    Finds the same match as _verb_pattern(verbs) with an Aho-Corasick
+    automaton: the leftmost verb with a word boundary on both sides and at
+    least one more character on its line, through the end of that line.
+    """
+
+    __slots__ = ("_automaton", "_fallback")
+
+    def __init__(self, verbs: Sequence[str], fallback: "re.Pattern"):
+        self._automaton = ahocorasick.Automaton()
+        for verb in verbs:
+            self._automaton.add_word(verb, len(verb))
+        self._automaton.make_automaton()
+        self._fallback = _regex_finder(fallback)
+
+    def __call__(self, text: str) -> Optional[str]:
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Lowercasing changed offsets (rare non-ASCII case); use the regex
+            return self._fallback(text)
+
+        n = len(text)
+        best = None
+        for end, length in self._automaton.iter(lowered):
+            start = end - length + 1
+            if best is not None and start >= best:
+                continue
+            if start > 0 and _is_word_char(text[start - 1]):
+                continue
+            nxt = end + 1
+            if nxt >= n or text[nxt] == "\n" or _is_word_char(text[nxt]):
+                continue
+            best = start
+
+        if best is None:
+            return None
+        line_end = text.find("\n", best)
+        return text[best:line_end if line_end != -1 else n].strip()
+
+
+def _make_finder(environment: str) -> Callable[[str], Optional[str]]:
+    pattern = ACTION_PATTERNS[environment]
+    if ahocorasick is not None and environment in ACTION_VERBS:
+        return _VerbScanner(ACTION_VERBS[environment], pattern)
+    return _regex_finder(pattern)
+
+
+# Built once at import; keys match PromptManager environment names
+ACTION_FINDERS: Dict[str, Callable[[str], Optional[str]]] = {
+    env: _make_finder(env) for env in ACTION_PATTERNS
+}
+
+
+def get_action_finder(environment: str) -> Callable[[str], Optional[str]]:
+    """Return the fallback action finder for environment (ALFWorld's if unknown)."""
+    return ACTION_FINDERS.get(environment, ACTION_FINDERS["alfworld"])
@@ -1,34 +1,139 @@
+import logging
+import sys
+import threading
 from abc import ABC, abstractmethod
-from typing import Tuple, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Optional
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+from .action_parsing import THOUGHT_ACTION_RE, get_action_finder
+from ..utils import json_utils
+
+
+# Debug output of all agents; enabled by verbose=True
+log = logging.getLogger("zipact.agents")
+
+
+def enable_verbose_logging():
+    """Send agent debug messages to stdout, one message per verbose block."""
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(logging.DEBUG)
+
+
+def _request_key(messages: List[Dict[str, str]], max_tokens: int) -> int:
+    """Hash of the message contents and max_tokens (xxhash when installed)."""
+    if xxhash is not None:
+        h = xxhash.xxh64()
+        for message in messages:
+            h.update(message["role"])
+            h.update("\0")
+            h.update(message["content"])
+            h.update("\0")
+        h.update(str(max_tokens))
+        return h.intdigest()
+    return hash((tuple((m["role"], m["content"]) for m in messages), max_tokens))
+
+
+def _has_action_line(text: str) -> bool:
+    """Whether text has a non-empty "Action:" line (no fallback parsing needed)."""
+    return any(key == "Action" and value.strip() for key, value in THOUGHT_ACTION_RE.findall(text))
 
 
 class BaseAgent(ABC):
-    """Base class for all agents with step limit support."""
+    """
+    Base class for all agents with step limit support.
+    
+    Agents use __slots__ instead of a per-instance __dict__. Subclasses
+    must declare __slots__ for the attributes they add (or () if none),
+    otherwise instances get a __dict__ again.
+    """
+    
+    __slots__ = ("max_steps", "current_step", "last_thought", "_find_action", "_resp_cache",
+                 "_resp_lock", "speculative_samples")
     
     # Default maximum steps before giving up
     DEFAULT_MAX_STEPS = 50
     
-    def __init__(self, max_steps: int = None):
+    # Observation length shown in verbose runner output
+    VERBOSE_OBS_TRUNC = 300
+    
+    # Responses kept for repeated identical prompts (LRU)
+    RESPONSE_CACHE_SIZE = 128
+    
+    # Sampling temperatures of the speculative action calls, in preference order
+    SPECULATIVE_TEMPERATURES = (0.0, 0.3, 0.7)
+    
+    def __init__(self, max_steps: int = None, verbose: bool = False, speculative_samples: int = 1,
+                 response_cache: bool = False):
         """
         Initialize base agent.
         
         Args:
             max_steps: Maximum steps allowed. None means use DEFAULT_MAX_STEPS.
+            verbose: Enable debug output on the shared "zipact.agents" logger.
+                Agents log through it with lazy %-formatting, so with verbose
+                off a message costs one level check.
+            speculative_samples: Action calls sent concurrently per step (up
+                to len(SPECULATIVE_TEMPERATURES)); the first well-formed
+                response in temperature order is used. 1 (default) makes a
+                single greedy call.
+            response_cache: Keep the responses of this episode's requests
+                (RESPONSE_CACHE_SIZE, LRU) and answer an identical request
+                from them instead of calling the LLM. Cleared at the first
+                step of every episode, so a repeated episode is never served
+                from the previous one. Off by default: cached responses are
+                not counted as tokens used.
         """
+        if verbose:
+            enable_verbose_logging()
         self.max_steps = max_steps if max_steps is not None else self.DEFAULT_MAX_STEPS
         self.current_step = 0
         self.last_thought = ""
+        self._find_action = get_action_finder("alfworld")
+        self._resp_cache = OrderedDict() if response_cache else None
+        self._resp_lock = threading.Lock()  # cache may be shared by concurrent calls of one step
+        self.speculative_samples = speculative_samples
     
     @abstractmethod
     def reset(self, instruction: str):
         """Reset agent for a new task. Should reset current_step to 0."""
         pass
 
-    @abstractmethod
     def step(self, observation: str) -> str:
         """
         Process observation and return action.
-        Should increment current_step and check step limit.
+        
+        Checks the step limit and advances current_step, then delegates
+        to _step_impl. Subclasses implement _step_impl, not step.
+        
+        Returns:
+            action: Action string to execute
+            
+        Raises:
+            StopIteration: If step limit reached
+        """
+        if self.current_step >= self.max_steps:
+            raise StopIteration(f"Step limit ({self.max_steps}) reached")
+        if self.current_step == 0 and self._resp_cache:
+            # New episode: responses are only reused within one
+            with self._resp_lock:
+                self._resp_cache.clear()
+        self.current_step += 1
+        return self._step_impl(observation)
+    
+    @abstractmethod
+    def _step_impl(self, observation: str) -> str:
+        """
+        Agent-specific step logic; current_step is already advanced.
         
         Returns:
             action: Action string to execute
@@ -46,3 +151,154 @@ class BaseAgent(ABC):
     def get_last_thought(self) -> str:
         """Return the last thought for logging."""
         return self.last_thought
+    
+    def on_episode_end(self, success: bool, steps: int, max_steps: int):
+        """Hook called by the runner after each episode. No-op by default."""
+        pass
+    
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """Return structured agent state for logging (None if the agent has none)."""
+        return None
+    
+    def wants_admissible_commands(self) -> bool:
+        """Whether the runner should pass the environment's valid commands to set_admissible_commands."""
+        return False
+    
+    def set_admissible_commands(self, commands: List[str]):
+        """Hook called by the runner before each step with the currently valid commands. No-op by default."""
+        pass
+    
+    def get_system_prompts(self) -> Tuple[str, ...]:
+        """Static system prompts the agent sends (used to warm provider prefix caches)."""
+        prompt = getattr(self, "system_prompt", None)
+        return (prompt,) if prompt else ()
+    
+    def _count_tokens(self, text: str) -> int:
+        """Token count of text with the agent's LLM tokenizer (subclasses set self.llm)."""
+        return self.llm.count_tokens(text)
+    
+    def _cached_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 256,
+        response_format: Optional[Dict[str, Any]] = None,
+        speculative: bool = True,
+        stop: Optional[List[str]] = None
+    ) -> str:
+        """
+        Action chat call (greedy, or speculative with speculative_samples > 1).
+        With response_cache on, the response to an identical earlier request
+        of the episode is reused instead of calling the LLM again, e.g. when
+        the agent revisits a state. speculative=False always makes the
+        single greedy call (for non-action requests).
+        """
+        cache = self._resp_cache
+        if cache is None:
+            return self._uncached_chat(messages, max_tokens, response_format, speculative, stop)
+        
+        key = _request_key(messages, max_tokens)
+        if response_format is not None:
+            # The same prompt under another output constraint is another request
+            key = (key, json_utils.dumps(response_format))
+        if stop:
+            key = (key, tuple(stop))
+        with self._resp_lock:
+            response = cache.get(key)
+            if response is not None:
+                cache.move_to_end(key)
+                return response
+        
+        response = self._uncached_chat(messages, max_tokens, response_format, speculative, stop)
+        with self._resp_lock:
+            cache[key] = response
+            if len(cache) > self.RESPONSE_CACHE_SIZE:
+                cache.popitem(last=False)
+        return response
+    
+    def _uncached_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]],
+        speculative: bool,
+        stop: Optional[List[str]]
+    ) -> str:
+        """The LLM call behind _cached_chat."""
+        if speculative and self.speculative_samples > 1:
+            return self._speculative_chat(messages, max_tokens, response_format, stop)
+        return self.llm.chat(messages, temperature=0.0, max_tokens=max_tokens, stop=stop,
+                             response_format=response_format)
+    
+    def _speculative_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]] = None,
+        stop: Optional[List[str]] = None
+    ) -> str:
+        """
+        Sample the action at SPECULATIVE_TEMPERATURES concurrently and return
+        the first well-formed response, so a malformed greedy response does
+        not cost a serial retry. Falls back to the greedy response if none
+        is well-formed.
+        """
+        temperatures = self.SPECULATIVE_TEMPERATURES[:self.speculative_samples]
+        with ThreadPoolExecutor(max_workers=len(temperatures)) as ex:
+            futures = [
+                ex.submit(self.llm.chat, messages, t, max_tokens, stop, response_format)
+                for t in temperatures
+            ]
+            responses = [future.result() for future in futures]
+        for response in responses:
+            if self._is_well_formed(response):
+                return response
+        return responses[0]
+    
+    def _is_well_formed(self, response: str) -> bool:
+        """Whether an action response can be used as is (has an "Action:" line)."""
+        return _has_action_line(response)
+    
+    @staticmethod
+    def _render_template(template: str, instruction: str) -> Tuple[str, str]:
+        """
+        Fill instruction into a ReAct-style template once per task and
+        return the text before and after its {history} field, so each step
+        builds its prompt as prefix + history + suffix without re-running
+        str.format.
+        """
+        prefix, _, suffix = template.partition("{history}")
+        return prefix.format(instruction=instruction), suffix.format(instruction=instruction)
+    
+    def _set_action_finder(self, environment: str):
+        """Use the fallback action finder for environment (a PromptManager name)."""
+        self._find_action = get_action_finder(environment)
+    
+    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
+        """
+        Parse thought and action from response.
+        
+        If the response has neither a "Thought:" nor an "Action:" line, the
+        whole text is the thought and the action is the first match of the
+        environment's action finder ("look" if none).
+        """
+        thought = ""
+        action = None
+        
+        # One regex pass over the text; a later line overrides an earlier one
+        for key, value in THOUGHT_ACTION_RE.findall(text):
+            if key == "Thought":
+                thought = value.strip()
+            else:
+                action = value.strip()
+        
+        if not thought and not action:
+            thought = text.strip()
+            action = self._find_action(text)
+        
+        return thought, action or "look"
+    
+    def truncate_obs(self, observation: str) -> str:
+        """Shorten an observation for verbose printing."""
+        if len(observation) <= self.VERBOSE_OBS_TRUNC:
+            return observation
+        return observation[:self.VERBOSE_OBS_TRUNC] + "..."
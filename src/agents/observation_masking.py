@@ -1,8 +1,8 @@
-import re
-from typing import Tuple
-from .base import BaseAgent
+from collections import deque
+
+from .base import BaseAgent, log
 from ..llm.client import LLMClient
-from ..prompts.prompt_manager import PromptManager
+from ..prompts.prompt_manager import get_prompt_manager
 
 class ObservationMaskingAgent(BaseAgent):
     """
@@ -17,136 +17,144 @@ class ObservationMaskingAgent(BaseAgent):
     - WebShop: E-commerce navigation
     """
     
+    __slots__ = (
+        "llm",
+        "verbose",
+        "environment",
+        "keep_recent",
+        "token_budget",
+        "prompt_manager",
+        "system_prompt",
+        "instruction_template",
+        "_prompt_prefix",
+        "_prompt_suffix",
+        "instruction",
+        "_masked_str",
+        "_masked_tokens",
+        "_recent",
+        "_recent_tokens",
+    )
+    
     def __init__(
         self, 
         llm_client: LLMClient, 
         environment: str = "alfworld",
         keep_recent: int = 5,
+        token_budget: int = None,
         max_steps: int = 50,
-        verbose: bool = False
+        verbose: bool = False,
+        speculative_samples: int = 1,
+        response_cache: bool = False
     ):
         """
         Args:
             llm_client: LLM client
             environment: Environment type ('alfworld', 'sciworld', 'webshop')
             keep_recent: Number of recent observations to keep unmasked
+            token_budget: If set, also mask recent observations (oldest first)
+                while the history exceeds this many tokens
             max_steps: Maximum steps allowed before giving up (default: 50)
             verbose: Whether to print debug info
+            speculative_samples: Concurrent action samples per step (1 = single greedy call)
+            response_cache: Reuse responses to identical requests within an episode
         """
-        super().__init__(max_steps=max_steps)
+        super().__init__(max_steps=max_steps, verbose=verbose, speculative_samples=speculative_samples,
+                         response_cache=response_cache)
         self.llm = llm_client
         self.verbose = verbose
         self.environment = environment.lower()
         self.keep_recent = keep_recent
+        self.token_budget = token_budget
         
         # Load environment-specific prompts
-        self.prompt_manager = PromptManager(environment)
+        self.prompt_manager = get_prompt_manager(environment)
+        self._set_action_finder(self.prompt_manager.environment)
         self.system_prompt = self.prompt_manager.get_react_system_prompt()
         self.instruction_template = self.prompt_manager.get_react_template()
         
-        self.observations = []
-        self.thoughts = []
-        self.actions = []
+        # Steps whose observation is masked never change again, so they are
+        # rendered once into _masked_str; _recent holds the completed steps
+        # still shown in full as (full_text, masked_text, full_tokens).
+        # Token counts are tracked only with token_budget.
+        self._masked_str = ""
+        self._masked_tokens = 0
+        self._recent = deque()
+        self._recent_tokens = 0
         self.instruction = ""
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, "")
     
     def reset(self, instruction: str):
         """Reset for a new task."""
         self.instruction = instruction
-        self.observations = []
-        self.thoughts = []
-        self.actions = []
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, instruction)
+        self._masked_str = ""
+        self._masked_tokens = 0
+        self._recent = deque()
+        self._recent_tokens = 0
         self.last_thought = ""
         self.current_step = 0
         
-        if self.verbose:
-            print(f"\n[ObsMask] Starting task: {instruction}")
-            print(f"[ObsMask] Environment: {self.environment}")
-            print(f"[ObsMask] Max steps: {self.max_steps}")
+        log.debug(
+            "\n"
+            "[ObsMask] Starting task: %s\n"
+            "[ObsMask] Environment: %s\n"
+            "[ObsMask] Max steps: %s",
+            instruction, self.environment, self.max_steps
+        )
     
-    def step(self, observation: str) -> str:
+    def _step_impl(self, observation: str) -> str:
         """Process observation and return next action."""
-        # Check step limit
-        if self.is_step_limit_reached():
-            raise StopIteration(f"Step limit ({self.max_steps}) reached")
+        step_num = self.current_step
         
-        self.current_step += 1
+        # The current observation plus keep_recent - 1 earlier ones stay
+        # unmasked; older steps move into the masked prefix
+        while len(self._recent) > max(self.keep_recent - 1, 0):
+            self._mask_oldest()
         
-        # Store observation
-        self.observations.append(observation)
+        obs_text = observation if self.keep_recent > 0 else "[Observation masked]"
+        current_line = f"Observation {step_num}: {obs_text}"
         
-        # Build history with masked observations
-        history_parts = []
+        if self.token_budget is not None:
+            current_tokens = self._count_tokens(current_line)
+            while self._recent and self._masked_tokens + self._recent_tokens + current_tokens > self.token_budget:
+                self._mask_oldest()
         
-        for i in range(len(self.observations)):
-            step_num = i + 1
-            
-            # Mask old observations
-            if i < len(self.observations) - self.keep_recent:
-                obs_text = "[Observation masked]"
-            else:
-                obs_text = self.observations[i]
-            
-            history_parts.append(f"Observation {step_num}: {obs_text}")
-            
-            # Add thought and action if they exist
-            if i < len(self.thoughts):
-                history_parts.append(f"Thought {step_num}: {self.thoughts[i]}")
-            if i < len(self.actions):
-                history_parts.append(f"Action {step_num}: {self.actions[i]}")
+        history_str = self._masked_str + "".join(full for full, _, _ in self._recent) + current_line
         
-        history_str = "\n".join(history_parts)
-        
-        prompt = self.instruction_template.format(
-            instruction=self.instruction,
-            history=history_str
-        )
+        prompt = self._prompt_prefix + history_str + self._prompt_suffix
         
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=256)
+        response = self._cached_chat(messages, max_tokens=256)
         
         # Parse thought and action
         thought, action = self._parse_thought_action(response)
         
-        # Store thought and action
-        self.thoughts.append(thought)
-        self.actions.append(action)
+        # Store the completed step
+        full = f"Observation {step_num}: {observation}\nThought {step_num}: {thought}\nAction {step_num}: {action}\n"
+        masked = f"Observation {step_num}: [Observation masked]\nThought {step_num}: {thought}\nAction {step_num}: {action}\n"
+        full_tokens = self._count_tokens(full) if self.token_budget is not None else 0
+        self._recent.append((full, masked, full_tokens))
+        self._recent_tokens += full_tokens
         self.last_thought = thought
         
-        if self.verbose:
-            print(f"\n[ObsMask] Step {self.current_step}/{self.max_steps}")
-            print(f"[ObsMask] Thought: {thought}")
-            print(f"[ObsMask] Action: {action}")
+        log.debug(
+            "\n"
+            "[ObsMask] Step %s/%s\n"
+            "[ObsMask] Thought: %s\n"
+            "[ObsMask] Action: %s",
+            self.current_step, self.max_steps, thought, action
+        )
         
         return action
     
-    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
-        """Parse thought and action from response."""
-        thought = ""
-        action = "look"
-        
-        lines = text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Thought:"):
-                thought = line.replace("Thought:", "").strip()
-            elif line.startswith("Action:"):
-                action = line.replace("Action:", "").strip()
-        
-        if not thought and not action:
-            thought = text.strip()
-            # Environment-specific action patterns
-            if self.environment == "webshop":
-                action_match = re.search(r'(search\[.+?\]|click\[.+?\]|back)', text, re.IGNORECASE)
-            elif self.environment == "sciworld":
-                action_match = re.search(r'\b(look around|go to|pick up|put down|put|pour|open|close|activate|deactivate|focus on|wait|mix|connect|use|read|examine)\b.+', text, re.IGNORECASE)
-            else:  # alfworld
-                action_match = re.search(r'\b(go to|take|put|open|close|clean|heat|cool|toggle|use|look|inventory)\b.+', text, re.IGNORECASE)
-            
-            if action_match:
-                action = action_match.group(0).strip()
-        
-        return thought, action
+    def _mask_oldest(self):
+        """Move the oldest unmasked step into the masked prefix."""
+        _, masked, full_tokens = self._recent.popleft()
+        self._masked_str += masked
+        self._recent_tokens -= full_tokens
+        if self.token_budget is not None:
+            self._masked_tokens += self._count_tokens(masked)
@@ -0,0 +1,79 @@
+"""
+Persistent cache of ZipAct initial plans, keyed by task keywords.
+
+Tasks of the same family ("heat some mug and put it in cabinet") share a
+keyword key built from the instruction: lowercase words without articles,
+fillers and numbers, sorted. When an episode succeeds, ZipAct stores the
+initial state it planned for the task; a later task with the same key
+starts from that state and skips the state-initialization LLM call.
+
+Plans are stored in a SQLite file, so the cache survives across runs and
+can be shared by concurrent agents.
+"""
+
+import re
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, Optional
+
+from ..utils import json_utils
+
+
+# Words that do not distinguish task families
+_STOPWORDS = frozenset((
+    "a", "an", "the", "some", "any", "it", "them", "its", "and", "then", "in", "on",
+    "into", "onto", "to", "of", "with", "at", "for", "from", "your", "you", "is",
+    "are", "be", "please", "task",
+))
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def instruction_keyword(instruction: str) -> str:
+    """Cache key of an instruction: its sorted content words."""
+    words = {w for w in _WORD_RE.findall(instruction.lower()) if w not in _STOPWORDS}
+    return " ".join(sorted(words))
+
+
+class PlanCache:
+    """
+    SQLite-backed map from instruction keyword to initial ZipAct state.
+
+    Usage:
+        cache = PlanCache("logs/plan_cache.sqlite")
+        state = cache.get(instruction)      # None on a miss
+        cache.put(instruction, state)       # after a successful episode
+    """
+
+    __slots__ = ("path", "_lock")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans (keyword TEXT PRIMARY KEY, template TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation, so an agent may move
+        # between runner threads
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, instruction: str) -> Optional[Dict[str, Any]]:
+        """Return the cached initial state for instruction's task family, or None."""
+        with self._lock, closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT template FROM plans WHERE keyword = ?", (instruction_keyword(instruction),)
+            ).fetchone()
+        return json_utils.loads(row[0]) if row else None
+
+    def put(self, instruction: str, state: Dict[str, Any]):
+        """Store (or replace) the initial state for instruction's task family."""
+        template = json_utils.dumps(state).decode("utf-8")
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO plans (keyword, template) VALUES (?, ?)",
+                (instruction_keyword(instruction), template)
+            )
@@ -1,8 +1,9 @@
-import re
-from typing import Tuple, Optional
-from .base import BaseAgent
+from array import array
+from typing import List
+
+from .base import BaseAgent, log
 from ..llm.client import LLMClient
-from ..prompts.prompt_manager import PromptManager
+from ..prompts.prompt_manager import get_prompt_manager
 
 class ReActAgent(BaseAgent):
     """
@@ -17,12 +18,28 @@ class ReActAgent(BaseAgent):
     - WebShop: E-commerce navigation
     """
     
+    __slots__ = (
+        "llm",
+        "verbose",
+        "environment",
+        "prompt_manager",
+        "system_prompt",
+        "instruction_template",
+        "_prompt_prefix",
+        "_prompt_suffix",
+        "_history_str",
+        "_line_ends",
+        "instruction",
+    )
+    
     def __init__(
         self, 
         llm_client: LLMClient, 
         environment: str = "alfworld",
         max_steps: int = 50,
-        verbose: bool = False
+        verbose: bool = False,
+        speculative_samples: int = 1,
+        response_cache: bool = False
     ):
         """
         Initialize ReAct agent.
@@ -32,33 +49,46 @@ class ReActAgent(BaseAgent):
             environment: Environment type ('alfworld', 'sciworld', 'webshop')
             max_steps: Maximum steps allowed before giving up (default: 50)
             verbose: Whether to print debug info
+            speculative_samples: Concurrent action samples per step (1 = single greedy call)
+            response_cache: Reuse responses to identical requests within an episode
         """
-        super().__init__(max_steps=max_steps)
+        super().__init__(max_steps=max_steps, verbose=verbose, speculative_samples=speculative_samples,
+                         response_cache=response_cache)
         self.llm = llm_client
         self.verbose = verbose
         self.environment = environment.lower()
         
         # Load environment-specific prompts
-        self.prompt_manager = PromptManager(environment)
+        self.prompt_manager = get_prompt_manager(environment)
+        self._set_action_finder(self.prompt_manager.environment)
         self.system_prompt = self.prompt_manager.get_react_system_prompt()
         self.instruction_template = self.prompt_manager.get_react_template()
         
-        self.history = []
+        # History is kept once, as the prompt text "\n".join(lines) + "\n" built
+        # incrementally; _line_ends holds each line's end offset in it
+        self._history_str = ""
+        self._line_ends = array("I")
         self.instruction = ""
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, "")
     
     def reset(self, instruction: str):
         """Reset for a new task."""
         self.instruction = instruction
-        self.history = []
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, instruction)
+        self._history_str = ""
+        self._line_ends = array("I")
         self.last_thought = ""
         self.current_step = 0
         
-        if self.verbose:
-            print(f"\n[ReAct] Starting task: {instruction}")
-            print(f"[ReAct] Environment: {self.environment}")
-            print(f"[ReAct] Max steps: {self.max_steps}")
+        log.debug(
+            "\n"
+            "[ReAct] Starting task: %s\n"
+            "[ReAct] Environment: %s\n"
+            "[ReAct] Max steps: %s",
+            instruction, self.environment, self.max_steps
+        )
     
-    def step(self, observation: str) -> str:
+    def _step_impl(self, observation: str) -> str:
         """
         Process observation and return next action.
         
@@ -67,73 +97,56 @@ class ReActAgent(BaseAgent):
             
         Returns:
             action: Action string to execute
-            
-        Raises:
-            StopIteration: If step limit reached
         """
-        # Check step limit
-        if self.is_step_limit_reached():
-            raise StopIteration(f"Step limit ({self.max_steps}) reached")
-        
-        self.current_step += 1
         step_num = self.current_step
         
-        # Add observation to history
-        self.history.append(f"Observation {step_num}: {observation}")
+        obs_line = f"Observation {step_num}: {observation}"
         
-        # Construct prompt with full history
-        history_str = "\n".join(self.history)
-        prompt = self.instruction_template.format(
-            instruction=self.instruction,
-            history=history_str
-        )
+        # Construct prompt with full history (appended to, not re-joined)
+        history_str = self._history_str + obs_line
+        prompt = self._prompt_prefix + history_str + self._prompt_suffix
         
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=256)
+        response = self._cached_chat(messages, max_tokens=256)
         
         # Parse thought and action
         thought, action = self._parse_thought_action(response)
         
         # Add to history (same step number)
-        self.history.append(f"Thought {step_num}: {thought}")
-        self.history.append(f"Action {step_num}: {action}")
+        thought_line = f"Thought {step_num}: {thought}"
+        action_line = f"Action {step_num}: {action}"
+        self._history_str = f"{history_str}\n{thought_line}\n{action_line}\n"
+        obs_end = len(history_str)
+        thought_end = obs_end + 1 + len(thought_line)
+        self._line_ends.extend((obs_end, thought_end, thought_end + 1 + len(action_line)))
         
         self.last_thought = thought
         
-        if self.verbose:
-            print(f"\n[ReAct] Step {step_num}/{self.max_steps}")
-            print(f"[ReAct] Thought: {thought}")
-            print(f"[ReAct] Action: {action}")
+        log.debug(
+            "\n"
+            "[ReAct] Step %s/%s\n"
+            "[ReAct] Thought: %s\n"
+            "[ReAct] Action: %s",
+            step_num, self.max_steps, thought, action
+        )
         
         return action
     
+    @property
+    def history(self) -> List[str]:
+        """History lines (observations, thoughts and actions) in order."""
+        text = self._history_str
+        lines = []
+        start = 0
+        for end in self._line_ends:
+            lines.append(text[start:end])
+            start = end + 1
+        return lines
+    
     def get_history_length(self) -> int:
         """Return the length of history (for analysis)."""
-        return len(self.history)
-    
-    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
-        """Parse thought and action from response."""
-        thought = ""
-        action = "look"  # Default action
-        
-        lines = text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Thought:"):
-                thought = line.replace("Thought:", "").strip()
-            elif line.startswith("Action:"):
-                action = line.replace("Action:", "").strip()
-        
-        # If no explicit thought/action found, try to extract them
-        if not thought and not action:
-            thought = text.strip()
-            # Try to find action-like commands
-            action_match = re.search(r'\b(go to|take|put|open|close|clean|heat|cool|toggle|use|look|inventory)\b.+', text, re.IGNORECASE)
-            if action_match:
-                action = action_match.group(0).strip()
-        
-        return thought, action
+        return len(self._line_ends)
@@ -1,8 +1,9 @@
 import re
-from typing import Tuple, List
-from .base import BaseAgent
+from array import array
+from typing import Dict, List, Optional
+from .base import BaseAgent, log
 from ..llm.client import LLMClient
-from ..prompts.prompt_manager import PromptManager
+from ..prompts.prompt_manager import get_prompt_manager
 
 REFLEXION_PROMPT = """Based on the failed attempt, reflect on what went wrong and what you should do differently.
 
@@ -17,6 +18,17 @@ Provide a brief reflection (2-3 sentences) on:
 
 Reflection:"""
 
+# Appended to the prompt on the last allowed step, so a reflection for a
+# max-steps failure comes with the final action instead of an extra call
+LAST_STEP_REFLECTION_SUFFIX = """
+
+This is your last step. After your Action line, add a line starting with "Reflection:" with a brief reflection (2-3 sentences) on what went wrong in this attempt and what you should try differently, in case the task is not completed."""
+
+# Tokens kept from each end of the history when summarizing it for reflection
+REFLECTION_HISTORY_TOKENS = 125
+
+REFLECTION_RE = re.compile(r'^\s*Reflection:(.*)', re.MULTILINE | re.DOTALL)
+
 class ReflexionAgent(BaseAgent):
     """
     Reflexion Agent: ReAct + Self-Reflection on failures.
@@ -30,12 +42,31 @@ class ReflexionAgent(BaseAgent):
     - WebShop: E-commerce navigation
     """
     
+    __slots__ = (
+        "llm",
+        "verbose",
+        "environment",
+        "prompt_manager",
+        "system_prompt",
+        "instruction_template",
+        "_prompt_prefix",
+        "_prompt_suffix",
+        "_history_str",
+        "_line_ends",
+        "instruction",
+        "reflections",
+        "episode_count",
+        "_pending_reflection",
+    )
+    
     def __init__(
         self, 
         llm_client: LLMClient, 
         environment: str = "alfworld",
         max_steps: int = 50,
-        verbose: bool = False
+        verbose: bool = False,
+        speculative_samples: int = 1,
+        response_cache: bool = False
     ):
         """
         Initialize Reflexion agent.
@@ -45,82 +76,115 @@ class ReflexionAgent(BaseAgent):
             environment: Environment type ('alfworld', 'sciworld', 'webshop')
             max_steps: Maximum steps allowed before giving up (default: 50)
             verbose: Whether to print debug info
+            speculative_samples: Concurrent action samples per step (1 = single greedy call)
+            response_cache: Reuse responses to identical requests within an episode
         """
-        super().__init__(max_steps=max_steps)
+        super().__init__(max_steps=max_steps, verbose=verbose, speculative_samples=speculative_samples,
+                         response_cache=response_cache)
         self.llm = llm_client
         self.verbose = verbose
         self.environment = environment.lower()
         
         # Load environment-specific prompts
-        self.prompt_manager = PromptManager(environment)
+        self.prompt_manager = get_prompt_manager(environment)
+        self._set_action_finder(self.prompt_manager.environment)
         self.system_prompt = self.prompt_manager.get_react_system_prompt()
         self.instruction_template = self.prompt_manager.get_react_template()
         
-        self.history = []
+        # History is kept once, as the prompt text "\n".join(lines) + "\n" built
+        # incrementally; _line_ends holds each line's end offset in it
+        self._history_str = ""
+        self._line_ends = array("I")
         self.reflections = []
         self.instruction = ""
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, "")
         self.episode_count = 0
+        self._pending_reflection = None
     
     def reset(self, instruction: str):
         """Reset for a new task (but keep reflections from previous episodes)."""
         self.instruction = instruction
-        self.history = []
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, instruction)
+        self._history_str = ""
+        self._line_ends = array("I")
         self.last_thought = ""
         self.current_step = 0
         self.episode_count += 1
+        self._pending_reflection = None
         
-        if self.verbose:
-            print(f"\n[Reflexion] Starting task (attempt #{self.episode_count}): {instruction}")
-            print(f"[Reflexion] Environment: {self.environment}")
-            print(f"[Reflexion] Max steps: {self.max_steps}")
-            if self.reflections:
-                print(f"[Reflexion] Using {len(self.reflections)} past reflections")
+        log.debug(
+            "\n"
+            "[Reflexion] Starting task (attempt #%s): %s\n"
+            "[Reflexion] Environment: %s\n"
+            "[Reflexion] Max steps: %s",
+            self.episode_count, instruction, self.environment, self.max_steps
+        )
+        if self.reflections:
+            log.debug("[Reflexion] Using %s past reflections", len(self.reflections))
     
-    def step(self, observation: str) -> str:
+    @property
+    def history(self) -> List[str]:
+        """History lines (observations, thoughts and actions) in order."""
+        text = self._history_str
+        lines = []
+        start = 0
+        for end in self._line_ends:
+            lines.append(text[start:end])
+            start = end + 1
+        return lines
+    
+    def _step_impl(self, observation: str) -> str:
         """Process observation and return next action."""
-        # Check step limit
-        if self.is_step_limit_reached():
-            raise StopIteration(f"Step limit ({self.max_steps}) reached")
-        
-        self.current_step += 1
         step_num = self.current_step
         
-        # Add observation to history
-        self.history.append(f"Observation {step_num}: {observation}")
+        obs_line = f"Observation {step_num}: {observation}"
         
-        # Construct prompt with full history + reflections
-        history_str = "\n".join(self.history)
+        # Construct prompt with full history (appended to, not re-joined) + reflections
+        history_str = self._history_str + obs_line
         
         # Include reflections if available
         reflection_str = ""
         if self.reflections:
             reflection_str = "\n\nPast Reflections:\n" + "\n".join([f"- {r}" for r in self.reflections[-3:]])  # Last 3 reflections
         
-        prompt = self.instruction_template.format(
-            instruction=self.instruction,
-            history=history_str + reflection_str
-        )
+        prompt = self._prompt_prefix + history_str + reflection_str + self._prompt_suffix
+        
+        is_last_step = self.current_step >= self.max_steps
+        if is_last_step:
+            prompt += LAST_STEP_REFLECTION_SUFFIX
         
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=256)
+        # Leave room for the reflection on the last step
+        response = self._cached_chat(messages, max_tokens=456 if is_last_step else 256)
         
         # Parse thought and action
         thought, action = self._parse_thought_action(response)
         
+        if is_last_step:
+            match = REFLECTION_RE.search(response)
+            self._pending_reflection = match.group(1).strip() if match else None
+        
         # Add to history (same step number)
-        self.history.append(f"Thought {step_num}: {thought}")
-        self.history.append(f"Action {step_num}: {action}")
+        thought_line = f"Thought {step_num}: {thought}"
+        action_line = f"Action {step_num}: {action}"
+        self._history_str = f"{history_str}\n{thought_line}\n{action_line}\n"
+        obs_end = len(history_str)
+        thought_end = obs_end + 1 + len(thought_line)
+        self._line_ends.extend((obs_end, thought_end, thought_end + 1 + len(action_line)))
         
         self.last_thought = thought
         
-        if self.verbose:
-            print(f"\n[Reflexion] Step {self.current_step}/{self.max_steps}")
-            print(f"[Reflexion] Thought: {thought}")
-            print(f"[Reflexion] Action: {action}")
+        log.debug(
+            "\n"
+            "[Reflexion] Step %s/%s\n"
+            "[Reflexion] Thought: %s\n"
+            "[Reflexion] Action: %s",
+            self.current_step, self.max_steps, thought, action
+        )
         
         return action
     
@@ -130,23 +194,50 @@ class ReflexionAgent(BaseAgent):
             # No need to reflect on success
             return
         
+        if self._pending_reflection:
+            # Written alongside the final action (see LAST_STEP_REFLECTION_SUFFIX)
+            reflection = self._pending_reflection
+            self._pending_reflection = None
+            self.apply_reflection(reflection)
+            return
+        
+        messages = self.prepare_reflection_messages(success, failure_reason)
+        self.apply_reflection(self._request_reflection(messages))
+    
+    def prepare_reflection_messages(self, success: bool, failure_reason: str = "Task not completed") -> Optional[List[Dict[str, str]]]:
+        """
+        Return the messages for a reflection LLM call, without making it.
+        
+        None if no call is needed: the episode succeeded, or an inline
+        reflection from the last step is pending (reflect() uses it).
+        """
+        if success or self._pending_reflection:
+            return None
+        
         # Generate reflection based on history and failure
         history_summary = self._summarize_history()
         
-        messages = [
+        return [
             {"role": "user", "content": REFLEXION_PROMPT.format(
                 history_summary=history_summary,
                 failure_reason=failure_reason
             )}
         ]
-        
-        response = self.llm.chat(messages, temperature=0.3, max_tokens=200)
-        reflection = response.strip()
-        
+    
+    def apply_reflection(self, text: str):
+        """Store a reflection (an LLM response) for future attempts."""
+        reflection = text.strip()
         self.reflections.append(reflection)
         
-        if self.verbose:
-            print(f"\n[Reflexion] Generated reflection: {reflection}")
+        log.debug("\n[Reflexion] Generated reflection: %s", reflection)
+    
+    def _request_reflection(self, messages: List[Dict[str, str]]) -> str:
+        return self.llm.chat(messages, temperature=0.3, max_tokens=200)
+    
+    def on_episode_end(self, success: bool, steps: int, max_steps: int):
+        """Reflect on a failed episode so the next attempt can use it."""
+        if not success:
+            self.reflect(success, failure_reason="Max steps reached" if steps >= max_steps else "Task failed")
     
     def get_reflections(self) -> List[str]:
         """Return all reflections."""
@@ -154,37 +245,12 @@ class ReflexionAgent(BaseAgent):
     
     def _summarize_history(self) -> str:
         """Create a brief summary of the episode for reflection."""
-        # Take first 500 and last 500 characters of history
-        history_str = "\n".join(self.history)
-        if len(history_str) > 1000:
-            return history_str[:500] + "\n...\n" + history_str[-500:]
+        # Take the first and last REFLECTION_HISTORY_TOKENS tokens of history
+        history_str = self._history_str[:-1]
+        encoding = self.llm.encoding
+        tokens = encoding.encode(history_str, disallowed_special=())
+        if len(tokens) > 2 * REFLECTION_HISTORY_TOKENS:
+            return (encoding.decode(tokens[:REFLECTION_HISTORY_TOKENS]) + "\n...\n"
+                    + encoding.decode(tokens[-REFLECTION_HISTORY_TOKENS:]))
         return history_str
-    
-    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
-        """Parse thought and action from response."""
-        thought = ""
-        action = "look"
-        
-        lines = text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Thought:"):
-                thought = line.replace("Thought:", "").strip()
-            elif line.startswith("Action:"):
-                action = line.replace("Action:", "").strip()
-        
-        if not thought and not action:
-            thought = text.strip()
-            # Environment-specific action patterns
-            if self.environment == "webshop":
-                action_match = re.search(r'(search\[.+?\]|click\[.+?\]|back)', text, re.IGNORECASE)
-            elif self.environment == "sciworld":
-                action_match = re.search(r'\b(look around|go to|pick up|put down|put|pour|open|close|activate|deactivate|focus on|wait|mix|connect|use|read|examine)\b.+', text, re.IGNORECASE)
-            else:  # alfworld
-                action_match = re.search(r'\b(go to|take|put|open|close|clean|heat|cool|toggle|use|look|inventory)\b.+', text, re.IGNORECASE)
-            
-            if action_match:
-                action = action_match.group(0).strip()
-        
-        return thought, action
 
@@ -1,17 +1,22 @@
-import re
-from typing import Tuple
-from .base import BaseAgent
+from collections import deque
+from itertools import islice
+from typing import Deque, Dict, List, Tuple
+
+from .base import BaseAgent, log
 from ..llm.client import LLMClient
-from ..prompts.prompt_manager import PromptManager
+from ..prompts.prompt_manager import get_prompt_manager
 
-SUMMARY_PROMPT = """Summarize the following interaction history into a concise summary (3-5 sentences) that captures:
+SUMMARY_PROMPT = """Update the summary of the interaction so far with the new events below. Write a concise summary (3-5 sentences) that captures:
 1. What has been explored
 2. What objects have been found
 3. What actions have been attempted
 4. Current progress toward the goal
 
-History:
-{history}
+Previous summary:
+{previous_summary}
+
+New events:
+{new_events}
 
 Summary:"""
 
@@ -20,6 +25,8 @@ class SummaryAgent(BaseAgent):
     Summary Agent: ReAct with history summarization.
     
     Periodically summarizes history to compress context while retaining key information.
+    With compaction=True, history is instead compacted without an LLM call:
+    low-signal lines are dropped and every remaining line is kept verbatim.
     
     Supports multiple environments:
     - ALFWorld: Household tasks
@@ -27,143 +34,241 @@ class SummaryAgent(BaseAgent):
     - WebShop: E-commerce navigation
     """
     
+    __slots__ = (
+        "llm",
+        "verbose",
+        "environment",
+        "summary_interval",
+        "token_budget",
+        "compaction",
+        "prompt_manager",
+        "system_prompt",
+        "instruction_template",
+        "_prompt_prefix",
+        "_prompt_suffix",
+        "instruction",
+        "history",
+        "_history_keys",
+        "_text_pool",
+        "_text_index",
+        "_history_tokens",
+        "_compressed_len",
+        "summary",
+    )
+    
     def __init__(
         self, 
         llm_client: LLMClient, 
         environment: str = "alfworld",
         summary_interval: int = 10,
+        token_budget: int = None,
+        compaction: bool = False,
         max_steps: int = 50,
-        verbose: bool = False
+        verbose: bool = False,
+        speculative_samples: int = 1,
+        response_cache: bool = False
     ):
         """
         Args:
             llm_client: LLM client
             environment: Environment type ('alfworld', 'sciworld', 'webshop')
-            summary_interval: Summarize every N steps
+            summary_interval: Summarize every N steps; also the number of
+                recent history items (2 * N) kept after a summary
+            token_budget: If set, summarize when the history exceeds this many
+                tokens instead of every summary_interval steps, and at least
+                summary_interval items were added since the last summary
+            compaction: Compact history (drop repeated observations and
+                thoughts) instead of summarizing it with the LLM
             max_steps: Maximum steps allowed before giving up (default: 50)
             verbose: Whether to print debug info
+            speculative_samples: Concurrent action samples per step (1 = single greedy call)
+            response_cache: Reuse responses to identical requests within an episode
         """
-        super().__init__(max_steps=max_steps)
+        super().__init__(max_steps=max_steps, verbose=verbose, speculative_samples=speculative_samples,
+                         response_cache=response_cache)
         self.llm = llm_client
         self.verbose = verbose
         self.environment = environment.lower()
         self.summary_interval = summary_interval
+        self.token_budget = token_budget
+        self.compaction = compaction
         
         # Load environment-specific prompts
-        self.prompt_manager = PromptManager(environment)
+        self.prompt_manager = get_prompt_manager(environment)
+        self._set_action_finder(self.prompt_manager.environment)
         self.system_prompt = self.prompt_manager.get_react_system_prompt()
         self.instruction_template = self.prompt_manager.get_react_template()
         
-        self.history = []
+        # History lines not yet folded into the summary; deques so flushing
+        # the oldest items pops from the left instead of copying the rest
+        self.history: Deque[str] = deque()
+        # Parallel to history: (kind, text id) per line. Texts are interned in
+        # _text_pool/_text_index, so repeated observations compare as ints.
+        self._history_keys: Deque[Tuple[str, int]] = deque()
+        self._text_pool: List[str] = []
+        self._text_index: Dict[str, int] = {}
+        self._history_tokens = 0  # Token count of history (tracked only with token_budget)
+        self._compressed_len = 0  # History length after the last budget-triggered compression
         self.summary = ""
         self.instruction = ""
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, "")
     
     def reset(self, instruction: str):
         """Reset for a new task."""
         self.instruction = instruction
-        self.history = []
+        self._prompt_prefix, self._prompt_suffix = self._render_template(self.instruction_template, instruction)
+        self.history = deque()
+        self._history_keys = deque()
+        self._text_pool = []
+        self._text_index = {}
+        self._history_tokens = 0
+        self._compressed_len = 0
         self.summary = ""
         self.last_thought = ""
         self.current_step = 0
         
-        if self.verbose:
-            print(f"\n[Summary] Starting task: {instruction}")
-            print(f"[Summary] Environment: {self.environment}")
-            print(f"[Summary] Max steps: {self.max_steps}")
+        log.debug(
+            "\n"
+            "[Summary] Starting task: %s\n"
+            "[Summary] Environment: %s\n"
+            "[Summary] Max steps: %s",
+            instruction, self.environment, self.max_steps
+        )
     
-    def step(self, observation: str) -> str:
+    def _step_impl(self, observation: str) -> str:
         """Process observation and return next action."""
-        # Check step limit
-        if self.is_step_limit_reached():
-            raise StopIteration(f"Step limit ({self.max_steps}) reached")
-        
-        self.current_step += 1
-        
         # Add observation to history
-        self.history.append(f"Observation {self.current_step}: {observation}")
+        self._add_history("Observation", observation)
         
         # Check if we should summarize
-        if len(self.history) >= self.summary_interval * 2 and len(self.history) % (self.summary_interval * 2) == 0:
-            self._summarize_history()
+        compress = self._compact_history if self.compaction else self._summarize_history
+        if self.token_budget is not None:
+            # The kept window alone can exceed the budget; waiting for
+            # summary_interval new items stops a summary call on every step
+            if (self._history_tokens > self.token_budget
+                    and len(self.history) > self.summary_interval * 2
+                    and len(self.history) - self._compressed_len >= self.summary_interval):
+                compress()
+                self._compressed_len = len(self.history)
+        elif len(self.history) >= self.summary_interval * 2 and len(self.history) % (self.summary_interval * 2) == 0:
+            compress()
         
         # Build prompt with summary + recent history
         if self.summary:
             context = f"Summary of earlier steps:\n{self.summary}\n\nRecent history:\n"
             # Keep last summary_interval*2 items
-            recent_history = self.history[-(self.summary_interval * 2):]
-            context += "\n".join(recent_history)
+            start = max(len(self.history) - self.summary_interval * 2, 0)
+            context += "\n".join(islice(self.history, start, None))
         else:
             context = "\n".join(self.history)
         
-        prompt = self.instruction_template.format(
-            instruction=self.instruction,
-            history=context
-        )
+        prompt = self._prompt_prefix + context + self._prompt_suffix
         
         messages = [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": prompt}
         ]
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=256)
+        response = self._cached_chat(messages, max_tokens=256)
         
         # Parse thought and action
         thought, action = self._parse_thought_action(response)
         
         # Add to history
-        self.history.append(f"Thought {self.current_step}: {thought}")
-        self.history.append(f"Action {self.current_step}: {action}")
+        self._add_history("Thought", thought)
+        self._add_history("Action", action)
         
         self.last_thought = thought
         
-        if self.verbose:
-            print(f"\n[Summary] Step {self.current_step}/{self.max_steps}")
-            print(f"[Summary] Thought: {thought}")
-            print(f"[Summary] Action: {action}")
+        log.debug(
+            "\n"
+            "[Summary] Step %s/%s\n"
+            "[Summary] Thought: %s\n"
+            "[Summary] Action: %s",
+            self.current_step, self.max_steps, thought, action
+        )
         
         return action
     
+    def _add_history(self, kind: str, text: str):
+        """Append a "<kind> <step>: <text>" history line and its key."""
+        text_id = self._text_index.setdefault(text, len(self._text_pool))
+        if text_id == len(self._text_pool):
+            self._text_pool.append(text)
+        line = f"{kind} {self.current_step}: {text}"
+        self.history.append(line)
+        self._history_keys.append((kind, text_id))
+        if self.token_budget is not None:
+            self._history_tokens += self._count_tokens(line) + 1  # +1 for the newline
+    
+    def _compact_history(self):
+        """
+        Drop low-signal lines from all but the last 2 * summary_interval
+        history items, without an LLM call:
+        - an observation whose text appears again later (the latest copy
+          stays, which also covers no-op actions that repeat the previous
+          observation)
+        - a thought identical to the next thought (a restatement)
+        Actions are always kept, and surviving lines are unchanged.
+        """
+        keep = self.summary_interval * 2
+        boundary = len(self.history) - keep
+        if boundary <= 0:
+            return
+        
+        seen_obs = set()
+        next_thought = None
+        keep_flags = [True] * len(self.history)
+        # Walk newest to oldest so "appears later" is a set lookup (on text ids)
+        idx = len(self.history)
+        for kind, text_id in reversed(self._history_keys):
+            idx -= 1
+            if kind == "Observation":
+                if idx < boundary and text_id in seen_obs:
+                    keep_flags[idx] = False
+                    continue
+                seen_obs.add(text_id)
+            elif kind == "Thought":
+                if idx < boundary and text_id == next_thought:
+                    keep_flags[idx] = False
+                    continue
+                next_thought = text_id
+        
+        history = deque(line for line, flag in zip(self.history, keep_flags) if flag)
+        log.debug("\n[Summary] Compacted history: %s -> %s items", len(self.history), len(history))
+        
+        self.history = history
+        self._history_keys = deque(key for key, flag in zip(self._history_keys, keep_flags) if flag)
+        if self.token_budget is not None:
+            self._history_tokens = sum(self._count_tokens(line) + 1 for line in self.history)
+    
     def _summarize_history(self):
-        """Summarize the history up to this point."""
-        history_text = "\n".join(self.history)
+        """
+        Fold the history items that are about to be dropped into the summary.
+        
+        Only the previous summary and the flushed items are sent, so each
+        call costs O(summary_interval) tokens rather than O(episode length).
+        """
+        keep = self.summary_interval * 2
+        if len(self.history) <= keep:
+            return
+        flushed = list(islice(self.history, len(self.history) - keep))
         
         messages = [
-            {"role": "user", "content": SUMMARY_PROMPT.format(history=history_text)}
+            {"role": "user", "content": SUMMARY_PROMPT.format(
+                previous_summary=self.summary or "(none)",
+                new_events="\n".join(flushed)
+            )}
         ]
         
         response = self.llm.chat(messages, temperature=0.0, max_tokens=300)
         self.summary = response.strip()
         
-        if self.verbose:
-            print(f"\n[Summary] Generated summary: {self.summary}")
+        log.debug("\n[Summary] Generated summary: %s", self.summary)
         
-        # Clear old history, keep only recent items
-        self.history = self.history[-(self.summary_interval * 2):]
-    
-    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
-        """Parse thought and action from response."""
-        thought = ""
-        action = "look"
-        
-        lines = text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Thought:"):
-                thought = line.replace("Thought:", "").strip()
-            elif line.startswith("Action:"):
-                action = line.replace("Action:", "").strip()
-        
-        if not thought and not action:
-            thought = text.strip()
-            # Environment-specific action patterns
-            if self.environment == "webshop":
-                action_match = re.search(r'(search\[.+?\]|click\[.+?\]|back)', text, re.IGNORECASE)
-            elif self.environment == "sciworld":
-                action_match = re.search(r'\b(look around|go to|pick up|put down|put|pour|open|close|activate|deactivate|focus on|wait|mix|connect|use|read|examine)\b.+', text, re.IGNORECASE)
-            else:  # alfworld
-                action_match = re.search(r'\b(go to|take|put|open|close|clean|heat|cool|toggle|use|look|inventory)\b.+', text, re.IGNORECASE)
-            
-            if action_match:
-                action = action_match.group(0).strip()
-        
-        return thought, action
+        # Drop the flushed items, keep only recent ones
+        for _ in flushed:
+            self.history.popleft()
+            self._history_keys.popleft()
+        if self.token_budget is not None:
+            self._history_tokens -= sum(self._count_tokens(line) + 1 for line in flushed)
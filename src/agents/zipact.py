@@ -1,9 +1,160 @@
+import copy
 import json
+import logging
 import re
-from typing import Dict, Any, Tuple, Optional
-from .base import BaseAgent
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Optional
+from .base import BaseAgent, log
+from .plan_cache import PlanCache
+from ..utils import json_utils
 from ..llm.client import LLMClient
-from ..prompts.prompt_manager import PromptManager
+from ..prompts.prompt_manager import get_prompt_manager
+
+# Per-step user messages. The static system prompt (updater or actor) comes
+# first, then this fixed text, with the state JSON and observation as the
+# only parts that change between calls.
+UPDATER_USER_TEMPLATE = """Previous State:
+```json
+{state}
+```
+
+Last Action: {last_action}
+
+New Observation:
+{observation}
+
+Analyze the transition and output the updated state in JSON format."""
+
+COMBINED_USER_TEMPLATE = """Previous State:
+```json
+{state}
+```
+
+Last Action: {last_action}
+
+New Observation:
+{observation}
+
+Update the state for this transition, then decide what to do next."""
+
+ACTOR_USER_TEMPLATE = """Current State:
+```json
+{state}
+```
+
+Immediate Observation:
+{observation}
+
+Decide what to do next."""
+
+# System prompt additions for compact_state / structured_actions
+COMPACT_STATE_NOTE = """
+
+Note: state JSON is minified (no whitespace); read it as regular JSON."""
+
+STRUCTURED_ACTOR_NOTE = """
+
+Output format override: instead of Thought/Action lines, respond with only a JSON object
+{"t": "<one-sentence thought>", "a": "<exact command>"}"""
+
+ACTION_FIRST_NOTE = """
+
+Output format override: write the Action line first, then the Thought line:
+Action: <exact command>
+Thought: [Brief reasoning]"""
+
+# Decoding stops once the action line is complete (the thought is skipped)
+ACTION_FIRST_STOP = ["\nThought:"]
+
+# Structured actor output {"t": thought, "a": action}, and its token budget
+ACTOR_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "actor_step",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"t": {"type": "string"}, "a": {"type": "string"}},
+            "required": ["t", "a"],
+            "additionalProperties": False,
+        },
+    },
+}
+STRUCTURED_ACTOR_MAX_TOKENS = 64
+
+# JSON mode for state updates: the reply is always one JSON object
+STATE_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def _guided_response_format(commands: List[str]) -> Dict[str, Any]:
+    """ACTOR_RESPONSE_FORMAT with "a" restricted to commands (server-side constrained decoding)."""
+    spec = ACTOR_RESPONSE_FORMAT["json_schema"]
+    schema = spec["schema"]
+    properties = {**schema["properties"], "a": {"type": "string", "enum": list(commands)}}
+    return {**ACTOR_RESPONSE_FORMAT, "json_schema": {**spec, "schema": {**schema, "properties": properties}}}
+
+# Trailing comma before a closing brace/bracket (common LLM JSON slip)
+TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+# Serialization order of state sections and their fields (as in
+# _get_empty_state); see _canonical_state for keys the LLM adds
+STATE_KEY_ORDER = {
+    "goal_state": ("global_instruction", "sub_goal_queue", "current_objective"),
+    "world_state": ("location", "inventory", "entity_map", "discovered_objects"),
+    "constraint_state": ("negative_constraints", "visited_locations", "attempted_actions"),
+}
+
+
+# World-state fields an overlapped actor call may have seen stale; the
+# action also sees the new observation, which shows these changes
+OVERLAP_TOLERATED_FIELDS = ("location", "inventory")
+
+
+def _minor_update(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """Whether new differs from old only in OVERLAP_TOLERATED_FIELDS of world_state."""
+    if old.keys() != new.keys():
+        return False
+    for section, value in old.items():
+        other = new[section]
+        if section == "world_state" and isinstance(value, dict) and isinstance(other, dict):
+            value = {k: v for k, v in value.items() if k not in OVERLAP_TOLERATED_FIELDS}
+            other = {k: v for k, v in other.items() if k not in OVERLAP_TOLERATED_FIELDS}
+        if value != other:
+            return False
+    return True
+
+
+def _is_state(state: Any) -> bool:
+    """Whether state has all sections of a ZipAct state."""
+    return isinstance(state, dict) and all(section in state for section in STATE_KEY_ORDER)
+
+
+def _ordered(mapping: Dict[str, Any], first, last: Optional[str] = None) -> Dict[str, Any]:
+    """mapping with the keys of first in order, then its other keys, then last."""
+    ordered = {key: mapping[key] for key in first if key in mapping and key != last}
+    for key, value in mapping.items():
+        if key != last:
+            ordered.setdefault(key, value)
+    if last in mapping:
+        ordered[last] = mapping[last]
+    return ordered
+
+
+def _canonical_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    state with sections and fields in STATE_KEY_ORDER, so equal states
+    serialize identically. Keys the LLM adds go before constraint_state and
+    its attempted_actions, which stay last: that list only grows, so the
+    end of one step's state JSON tends to be a prefix of the next step's
+    for servers with prefix caching (e.g. vLLM --enable-prefix-caching).
+    """
+    ordered = _ordered(state, STATE_KEY_ORDER, "constraint_state")
+    for section, fields in STATE_KEY_ORDER.items():
+        value = ordered.get(section)
+        if isinstance(value, dict):
+            ordered[section] = _ordered(value, fields, "attempted_actions" if section == "constraint_state" else None)
+    return ordered
+
 
 class ZipActAgent(BaseAgent):
     """
@@ -24,12 +175,59 @@ class ZipActAgent(BaseAgent):
     - WebShop: E-commerce navigation
     """
     
+    __slots__ = (
+        "llm",
+        "verbose",
+        "environment",
+        "prompt_manager",
+        "init_prompt",
+        "_init_parts",
+        "updater_prompt",
+        "actor_prompt",
+        "state",
+        "last_action",
+        "plan_cache",
+        "instruction",
+        "_initial_state",
+        "_plan_from_cache",
+        "compact_state",
+        "overlap_updates",
+        "structured_actions",
+        "guided_actions",
+        "_action_format",
+        "json_state",
+        "_state_format",
+        "action_first",
+        "updater_llm",
+        "_state_text",
+        "combined_prompt",
+        "max_attempted_actions",
+        "_attempted_count",
+    )
+    
+    # Actor and updater responses both go through the (per-episode)
+    # response cache when response_cache is enabled
+    RESPONSE_CACHE_SIZE = 256
+    
     def __init__(
         self, 
         llm_client: LLMClient, 
         environment: str = "alfworld",
         max_steps: int = 50,
-        verbose: bool = False
+        verbose: bool = False,
+        speculative_samples: int = 1,
+        response_cache: bool = False,
+        plan_cache: Optional[str] = None,
+        compact_state: bool = False,
+        overlap_updates: bool = False,
+        structured_actions: bool = False,
+        guided_actions: bool = False,
+        updater_model: Optional[str] = None,
+        combined_step: bool = False,
+        max_attempted_actions: Optional[int] = None,
+        actor_examples: Optional[int] = None,
+        json_state: bool = False,
+        action_first: bool = False
     ):
         """
         Initialize ZipAct agent.
@@ -39,50 +237,159 @@ class ZipActAgent(BaseAgent):
             environment: Environment type ('alfworld', 'sciworld', 'webshop')
             max_steps: Maximum steps allowed before giving up (default: 50)
             verbose: Whether to print debug info
+            speculative_samples: Concurrent action samples per step (1 = single greedy call)
+            response_cache: Reuse responses to identical requests within an episode
+            plan_cache: Path of a SQLite plan cache. Initial states of successful
+                episodes are stored by task keywords, and a task with the same
+                keywords starts from the stored state without the init LLM call.
+            compact_state: Send the state as compact JSON (no indentation or
+                spaces) instead of 2-space indented JSON; fewer input tokens
+            overlap_updates: Run the actor on the previous state concurrently
+                with the state update, and keep its action if the update only
+                moved location/inventory (else the actor runs again). Cuts
+                per-step latency to about one LLM round-trip on most steps.
+            structured_actions: Ask the actor for a {"t": thought, "a": action}
+                JSON object (json_schema structured output, at most
+                STRUCTURED_ACTOR_MAX_TOKENS tokens) instead of Thought/Action
+                lines. Needs an endpoint that supports response_format.
+            guided_actions: Like structured_actions, with "a" restricted to the
+                environment's admissible commands (when it reports them), so
+                the server's constrained decoding can only produce valid
+                actions. Implies structured_actions.
+            updater_model: Smaller model (same endpoint) that drafts each
+                state update; the main model is only called when the draft
+                is not a parseable state. Its token usage is added to
+                llm_client's counters.
+            combined_step: After the first step, update the state and choose
+                the action in one LLM call (a combined updater + actor prompt)
+                instead of two. Falls back to the separate calls for the
+                parts missing from a malformed reply. The combined reply has
+                its own JSON format, so this cannot be used together with
+                structured_actions, guided_actions, action_first or
+                overlap_updates (ValueError); with json_state the combined
+                call is also made in JSON mode.
+            max_attempted_actions: Keep only this many most recent entries in
+                attempted_actions (None = all), with the total in
+                constraint_state.attempted_action_count. Bounds the state's
+                growth over long episodes; the anti-loop check only needs
+                recent attempts.
+            actor_examples: Keep only this many worked examples in the actor
+                prompt (None = all, 0 = none); fewer input tokens per actor
+                call.
+            json_state: Request the initial state and state updates in JSON
+                mode (response_format json_object), and drop the state
+                skeleton from the updater prompt, whose requests already show
+                the previous state. Needs an endpoint that supports
+                response_format.
+            action_first: Ask the actor for the Action line before the
+                Thought and stop decoding after the action, so no thought
+                tokens are generated (last_thought stays empty). Ignored
+                with structured_actions.
         """
-        super().__init__(max_steps=max_steps)
+        if combined_step:
+            conflicts = [name for name, enabled in (
+                ("structured_actions", structured_actions), ("guided_actions", guided_actions),
+                ("action_first", action_first), ("overlap_updates", overlap_updates),
+            ) if enabled]
+            if conflicts:
+                raise ValueError(f"combined_step cannot be combined with {', '.join(conflicts)}")
+        
+        super().__init__(max_steps=max_steps, verbose=verbose, speculative_samples=speculative_samples,
+                         response_cache=response_cache)
         self.llm = llm_client
         self.verbose = verbose
         self.environment = environment.lower()
         
         # Load environment-specific prompts
-        self.prompt_manager = PromptManager(environment)
-        self.updater_prompt = self.prompt_manager.get_zipact_updater_prompt()
-        self.actor_prompt = self.prompt_manager.get_zipact_actor_prompt()
+        self.prompt_manager = get_prompt_manager(environment)
+        self._set_action_finder(self.prompt_manager.environment)
+        self.updater_prompt = self.prompt_manager.get_zipact_updater_prompt(state_skeleton=not json_state)
+        self.actor_prompt = self.prompt_manager.get_zipact_actor_prompt(actor_examples)
         self.init_prompt = self.prompt_manager.get_zipact_init_prompt()
+        # Literal text around the init prompt's {instruction}, unescaped once:
+        # the template is mostly {{...}} JSON that str.format would re-scan
+        init_prefix, _, init_suffix = self.init_prompt.partition("{instruction}")
+        self._init_parts = (init_prefix.format(), init_suffix.format())
+        if compact_state:
+            self.updater_prompt += COMPACT_STATE_NOTE
+            self.actor_prompt += COMPACT_STATE_NOTE
+        self.combined_prompt = self.prompt_manager.get_zipact_combined_prompt(actor_examples) if combined_step else None
+        if compact_state and combined_step:
+            self.combined_prompt += COMPACT_STATE_NOTE
+        structured_actions = structured_actions or guided_actions
+        if structured_actions:
+            self.actor_prompt += STRUCTURED_ACTOR_NOTE
+        action_first = action_first and not structured_actions
+        if action_first:
+            self.actor_prompt += ACTION_FIRST_NOTE
         
         self.state = self._get_empty_state()
+        self._state_text = None
         self.last_action = None
+        self.plan_cache = PlanCache(plan_cache) if plan_cache else None
+        self.instruction = ""
+        self._initial_state = None
+        self._plan_from_cache = False
+        self.compact_state = compact_state
+        self.overlap_updates = overlap_updates
+        self.structured_actions = structured_actions
+        self.guided_actions = guided_actions
+        self._action_format = ACTOR_RESPONSE_FORMAT
+        self.json_state = json_state
+        self._state_format = STATE_RESPONSE_FORMAT if json_state else None
+        self.action_first = action_first
+        self.updater_llm = llm_client.for_model(updater_model) if updater_model else None
+        self.max_attempted_actions = max_attempted_actions
+        self._attempted_count = 0
     
     def reset(self, instruction: str):
         """Initialize state for a new task."""
         self.current_step = 0
         self.last_thought = ""
         
-        if self.verbose:
-            print(f"\n[ZipAct] Initializing state for task: {instruction}")
-            print(f"[ZipAct] Environment: {self.environment}")
-            print(f"[ZipAct] Max steps: {self.max_steps}")
+        log.debug(
+            "\n"
+            "[ZipAct] Initializing state for task: %s\n"
+            "[ZipAct] Environment: %s\n"
+            "[ZipAct] Max steps: %s",
+            instruction, self.environment, self.max_steps
+        )
         
-        # Use LLM to initialize structured state
-        messages = [
-            {"role": "system", "content": "You are a helpful assistant that initializes agent state."},
-            {"role": "user", "content": self.init_prompt.format(instruction=instruction)}
-        ]
+        self.instruction = instruction
+        cached = self.plan_cache.get(instruction) if self.plan_cache else None
+        self._plan_from_cache = cached is not None
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=512)
-        self.state = self._parse_json(response, default=self._get_empty_state())
+        if cached is not None:
+            # Same task family solved before: reuse its plan for this instance
+            self.state = cached
+            self.state.setdefault("goal_state", {})["global_instruction"] = instruction
+            log.debug("[ZipAct] Initial state from plan cache")
+        else:
+            # Use LLM to initialize structured state
+            messages = [
+                {"role": "system", "content": "You are a helpful assistant that initializes agent state."},
+                {"role": "user", "content": instruction.join(self._init_parts)}
+            ]
+            
+            response = self.llm.chat(messages, temperature=0.0, max_tokens=512,
+                                     response_format=self._state_format)
+            self.state = self._parse_json(response, default=self._get_empty_state())
         
         # Ensure global_instruction is set
         if not self.state.get("goal_state", {}).get("global_instruction"):
             self.state["goal_state"]["global_instruction"] = instruction
         
+        self._state_text = None
         self.last_action = None
+        self._attempted_count = 0
+        self._action_format = ACTOR_RESPONSE_FORMAT
+        # Snapshot for the plan cache; the state is mutated during the episode
+        self._initial_state = copy.deepcopy(self.state) if self.plan_cache else None
         
-        if self.verbose:
-            print(f"[ZipAct] Initial state: {json.dumps(self.state, indent=2)}")
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[ZipAct] Initial state: %s", json.dumps(self.state, indent=2))
     
-    def step(self, observation: str) -> str:
+    def _step_impl(self, observation: str) -> str:
         """
         Process observation and return next action.
         
@@ -91,34 +398,52 @@ class ZipActAgent(BaseAgent):
             
         Returns:
             action: Action string to execute
-            
-        Raises:
-            StopIteration: If step limit reached
         """
-        # Check step limit
-        if self.is_step_limit_reached():
-            raise StopIteration(f"Step limit ({self.max_steps}) reached")
-        
-        self.current_step += 1
-        
-        # Step 1: Update state (if not first step)
-        if self.last_action is not None:
-            self._update_state(observation)
-        
-        # Step 2: Actor decides next action
-        thought, action = self._act(observation)
+        if self.last_action is not None and self.combined_prompt:
+            thought, action = self._combined_update_and_act(observation)
+        elif self.last_action is not None and self.overlap_updates:
+            thought, action = self._overlapped_update_and_act(observation)
+        else:
+            # Step 1: Update state (if not first step)
+            if self.last_action is not None:
+                self._update_state(observation)
+            
+            # Step 2: Actor decides next action
+            thought, action = self._act(observation)
         
         # Store for next iteration
         self.last_action = action
         self.last_thought = thought
         
-        if self.verbose:
-            print(f"\n[ZipAct] Step {self.current_step}/{self.max_steps}")
-            print(f"[ZipAct] Thought: {thought}")
-            print(f"[ZipAct] Action: {action}")
+        log.debug(
+            "\n"
+            "[ZipAct] Step %s/%s\n"
+            "[ZipAct] Thought: %s\n"
+            "[ZipAct] Action: %s",
+            self.current_step, self.max_steps, thought, action
+        )
         
         return action
     
+    def on_episode_end(self, success: bool, steps: int, max_steps: int):
+        """Store the initial plan of a successful episode in the plan cache."""
+        if success and self.plan_cache and not self._plan_from_cache and self._initial_state:
+            self.plan_cache.put(self.instruction, self._initial_state)
+    
+    def wants_admissible_commands(self) -> bool:
+        """Admissible commands are only used with guided_actions."""
+        return self.guided_actions
+    
+    def set_admissible_commands(self, commands: List[str]):
+        """Restrict the next actor response to commands (any action if empty)."""
+        self._action_format = _guided_response_format(commands) if commands else ACTOR_RESPONSE_FORMAT
+    
+    def get_system_prompts(self) -> Tuple[str, ...]:
+        """The updater and actor system prompts (and the combined one, if used)."""
+        if self.combined_prompt:
+            return (self.combined_prompt, self.actor_prompt)
+        return (self.updater_prompt, self.actor_prompt)
+    
     def get_state(self) -> Dict[str, Any]:
         """Return current state for logging."""
         return self.state.copy()
@@ -128,44 +453,146 @@ class ZipActAgent(BaseAgent):
         Update state based on last action and new observation.
         Implements U: S_t <- U(S_{t-1}, a_{t-1}, o_t)
         """
-        # Ensure attempted_actions is tracked (code-level guarantee)
-        if self.last_action:
-            if "constraint_state" not in self.state:
-                self.state["constraint_state"] = {"attempted_actions": [], "negative_constraints": [], "visited_locations": []}
-            if "attempted_actions" not in self.state["constraint_state"]:
-                self.state["constraint_state"]["attempted_actions"] = []
-            if self.last_action not in self.state["constraint_state"]["attempted_actions"]:
-                self.state["constraint_state"]["attempted_actions"].append(self.last_action)
+        messages = self._updater_messages(observation)
+        response = self._updater_chat(messages)
+        self._apply_update(response)
+    
+    def _updater_chat(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Send an updater request (to the draft model first, if any). The
+        state JSON is canonical, so with response_cache a repeated (state,
+        action, observation) transition within an episode, e.g. a loop of
+        rejected actions, reuses the cached update instead of calling the
+        main LLM.
+        """
+        if self.updater_llm is not None:
+            response = self._draft_update(messages)
+            if response is not None:
+                return response
+        return self._cached_chat(messages, 800, self._state_format, speculative=False)
+    
+    def _draft_update(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """The updater_llm response to messages, or None if it is not a parseable state."""
+        response = self.updater_llm.chat(messages, temperature=0.0, max_tokens=800,
+                                         response_format=self._state_format)
+        input_tokens, output_tokens, _ = self.updater_llm.pop_token_usage()
+        self.llm.add_token_usage(input_tokens, output_tokens)
+        if _is_state(self._parse_json(response)):
+            return response
+        log.debug("[ZipAct] Draft state update rejected; asking the main model")
+        return None
+    
+    def _overlapped_update_and_act(self, observation: str) -> Tuple[str, str]:
+        """
+        Run U and π concurrently, π on S_{t-1}; keep its action unless the
+        update changed more than OVERLAP_TOLERATED_FIELDS.
+        """
+        update_messages = self._updater_messages(observation)
+        speculative_messages = self._actor_messages(observation)
+        previous_state = self.state
         
-        state_str = json.dumps(self.state, indent=2, ensure_ascii=False)
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            update = ex.submit(self._updater_chat, update_messages)
+            act = ex.submit(self._actor_chat, speculative_messages)
+            update_response = update.result()
+            act_response = act.result()
         
-        prompt = f"""Previous State:
-```json
-{state_str}
-```
-
-Last Action: {self.last_action}
-
-New Observation:
-{observation}
-
-Analyze the transition and output the updated state in JSON format."""
+        self._apply_update(update_response)
+        if _minor_update(previous_state, self.state):
+            return self._parse_actor_response(act_response)
         
+        log.debug("[ZipAct] State changed beyond location/inventory; re-running actor")
+        return self._act(observation)
+    
+    def _combined_update_and_act(self, observation: str) -> Tuple[str, str]:
+        """
+        U and π in one call: the reply carries the new state and the action.
+        A missing or malformed part is redone with _update_state / _act.
+        """
+        self._record_last_action()
+        prompt = COMBINED_USER_TEMPLATE.format(
+            state=self._state_json(),
+            last_action=self.last_action,
+            observation=observation
+        )
         messages = [
-            {"role": "system", "content": self.updater_prompt},
+            {"role": "system", "content": self.combined_prompt},
             {"role": "user", "content": prompt}
         ]
+        reply = self._parse_json(self._cached_chat(messages, 1024, self._state_format, speculative=False))
         
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=800)
-        new_state = self._parse_json(response, default=self.state)
+        new_state = reply.get("state") if isinstance(reply, dict) else None
+        if _is_state(new_state):
+            self._apply_state(new_state)
+        else:
+            log.debug("[ZipAct] Combined reply has no state; running the updater")
+            self._update_state(observation)
+        
+        action = reply.get("action") if isinstance(reply, dict) else None
+        if isinstance(action, str) and action.strip():
+            thought = reply.get("thought")
+            return (thought.strip() if isinstance(thought, str) else ""), action.strip()
+        log.debug("[ZipAct] Combined reply has no action; running the actor")
+        return self._act(observation)
+    
+    def _updater_messages(self, observation: str) -> List[Dict[str, str]]:
+        """Record the last action and build the state-updater request."""
+        self._record_last_action()
         
+        prompt = UPDATER_USER_TEMPLATE.format(
+            state=self._state_json(),
+            last_action=self.last_action,
+            observation=observation
+        )
+        
+        return [
+            {"role": "system", "content": self.updater_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _record_last_action(self):
+        """Add the last action to attempted_actions."""
+        # Ensure attempted_actions is tracked (code-level guarantee)
+        if self.last_action:
+            if "constraint_state" not in self.state:
+                self.state["constraint_state"] = {"attempted_actions": [], "negative_constraints": [], "visited_locations": []}
+                self._state_text = None
+            if "attempted_actions" not in self.state["constraint_state"]:
+                self.state["constraint_state"]["attempted_actions"] = []
+                self._state_text = None
+            if self.last_action not in self.state["constraint_state"]["attempted_actions"]:
+                self.state["constraint_state"]["attempted_actions"].append(self.last_action)
+                self._attempted_count += 1
+                self._trim_attempted_actions()
+                self._state_text = None
+    
+    def _trim_attempted_actions(self):
+        """Apply max_attempted_actions to attempted_actions (oldest entries dropped)."""
+        limit = self.max_attempted_actions
+        if limit is None:
+            return
+        constraint_state = self.state["constraint_state"]
+        attempted = constraint_state["attempted_actions"]
+        if len(attempted) > limit:
+            del attempted[:len(attempted) - limit]
+        constraint_state["attempted_action_count"] = self._attempted_count
+    
+    def _apply_update(self, response: str):
+        """Replace the state with the updater's response (kept on a parse failure)."""
+        self._apply_state(self._parse_json(response, default=self.state))
+    
+    def _apply_state(self, new_state: Dict[str, Any]):
+        """Make new_state the current state, keeping the tracked attempted_actions."""
         if new_state:
             # Preserve attempted_actions from code-level tracking
             if "constraint_state" in new_state:
                 new_state["constraint_state"]["attempted_actions"] = self.state.get("constraint_state", {}).get("attempted_actions", [])
+                if self.max_attempted_actions is not None:
+                    new_state["constraint_state"]["attempted_action_count"] = self._attempted_count
             self.state = new_state
-            if self.verbose:
-                print(f"\n[ZipAct] Updated state: {json.dumps(self.state, indent=2)}")
+            self._state_text = None
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("\n[ZipAct] Updated state: %s", json.dumps(self.state, indent=2))
     
     def _act(self, observation: str) -> Tuple[str, str]:
         """
@@ -175,78 +602,103 @@ Analyze the transition and output the updated state in JSON format."""
         Returns:
             (thought, action): Reasoning and action
         """
-        state_str = json.dumps(self.state, indent=2, ensure_ascii=False)
+        messages = self._actor_messages(observation)
         
-        prompt = f"""Current State:
-```json
-{state_str}
-```
-
-Immediate Observation:
-{observation}
-
-Decide what to do next."""
-        
-        messages = [
-            {"role": "system", "content": self.actor_prompt},
-            {"role": "user", "content": prompt}
-        ]
-        
-        response = self.llm.chat(messages, temperature=0.0, max_tokens=256)
+        response = self._actor_chat(messages)
         
         # Parse thought and action
-        thought, action = self._parse_thought_action(response)
+        thought, action = self._parse_actor_response(response)
         
         return thought, action
     
+    def _actor_chat(self, messages: List[Dict[str, str]]) -> str:
+        """
+        Send an actor request (structured output when structured_actions is
+        on; stopped after the action with action_first).
+        """
+        if self.structured_actions:
+            return self._cached_chat(messages, STRUCTURED_ACTOR_MAX_TOKENS, self._action_format)
+        if self.action_first:
+            return self._cached_chat(messages, max_tokens=256, stop=ACTION_FIRST_STOP)
+        return self._cached_chat(messages, max_tokens=256)
+    
+    def _parse_actor_response(self, text: str) -> Tuple[str, str]:
+        """
+        (thought, action) from an actor response: the "t"/"a" fields of a
+        structured response, else the Thought/Action lines.
+        """
+        if self.structured_actions:
+            parsed = self._parse_structured_action(text)
+            if parsed is not None:
+                return parsed
+        return self._parse_thought_action(text)
+    
+    @staticmethod
+    def _parse_structured_action(text: str) -> Optional[Tuple[str, str]]:
+        """(thought, action) from a {"t": ..., "a": ...} response, or None if it is not one."""
+        try:
+            data = json_utils.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or not isinstance(data.get("a"), str) or not data["a"].strip():
+            return None
+        thought = data.get("t")
+        return (thought.strip() if isinstance(thought, str) else ""), data["a"].strip()
+    
+    def _is_well_formed(self, response: str) -> bool:
+        """Whether an actor response has an action (structured or an "Action:" line)."""
+        if self.structured_actions and self._parse_structured_action(response) is not None:
+            return True
+        return super()._is_well_formed(response)
+    
+    def _actor_messages(self, observation: str) -> List[Dict[str, str]]:
+        """Build the actor request for the current state."""
+        prompt = ACTOR_USER_TEMPLATE.format(
+            state=self._state_json(),
+            observation=observation
+        )
+        return [
+            {"role": "system", "content": self.actor_prompt},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _state_json(self) -> str:
+        """
+        The current state as prompt JSON, in canonical key order. The text
+        is kept until the state changes, so the actor call and the next
+        update (or both overlapped calls) serialize it once.
+        """
+        text = self._state_text
+        if text is None:
+            text = self._state_text = json_utils.dumps(
+                _canonical_state(self.state), indent=not self.compact_state
+            ).decode("utf-8")
+        return text
+    
     def _parse_json(self, text: str, default: Dict = None) -> Dict[str, Any]:
         """Parse JSON from LLM response."""
         if default is None:
             default = {}
         
         try:
-            # Try to extract JSON block
-            if "```json" in text:
-                json_str = text.split("```json")[1].split("```")[0].strip()
-            elif "```" in text:
-                json_str = text.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = text.strip()
-            
-            # Remove any trailing commas before closing braces/brackets
-            json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
+            json_str = text.strip()
+            if "```" in json_str:
+                # Try to extract JSON block (splitting only up to the block)
+                if "```json" in json_str:
+                    json_str = json_str.split("```json", 1)[1].split("```", 1)[0].strip()
+                else:
+                    json_str = json_str.split("```", 2)[1].strip()
             
-            return json.loads(json_str)
+            try:
+                return json_utils.loads(json_str)
+            except ValueError:
+                # Remove any trailing commas before closing braces/brackets;
+                # the stdlib parser also accepts NaN/Infinity
+                return json.loads(TRAILING_COMMA_RE.sub(r'\1', json_str))
         except Exception as e:
-            if self.verbose:
-                print(f"[ZipAct] Failed to parse JSON: {e}")
-                print(f"[ZipAct] Raw text: {text[:200]}...")
+            log.debug("[ZipAct] Failed to parse JSON: %s\n[ZipAct] Raw text: %s...", e, text[:200])
             return default
-    
-    def _parse_thought_action(self, text: str) -> Tuple[str, str]:
-        """Parse thought and action from response."""
-        thought = ""
-        action = "look"  # Default action
-        
-        lines = text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith("Thought:"):
-                thought = line.replace("Thought:", "").strip()
-            elif line.startswith("Action:"):
-                action = line.replace("Action:", "").strip()
         
-        # If no explicit thought/action found, try to extract them
-        if not thought and not action:
-            # Maybe the format is different, use the whole text as thought
-            thought = text.strip()
-            # Try to find action-like commands
-            action_match = re.search(r'\b(go to|take|put|open|close|clean|heat|cool|toggle|use|look|inventory)\b.+', text, re.IGNORECASE)
-            if action_match:
-                action = action_match.group(0).strip()
-        
-        return thought, action
-    
     def _get_empty_state(self) -> Dict[str, Any]:
         """Return an empty state template."""
         return {
@@ -267,4 +719,3 @@ Decide what to do next."""
                 "attempted_actions": []
             }
         }
-
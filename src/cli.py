@@ -0,0 +1,119 @@
+"""
+Command-line arguments shared by the ZipAct runner scripts.
+"""
+
+import argparse
+from typing import Any, Dict
+
+
+def common_parser() -> argparse.ArgumentParser:
+    """
+    Return a parser with the agent, experiment and API arguments used by
+    every runner. Pass it as a parent:
+
+        parser = argparse.ArgumentParser(parents=[common_parser()])
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+
+    # Agent settings
+    parser.add_argument("--agent", type=str, default="zipact",
+                       choices=["zipact", "react", "reflexion", "obs_mask", "summary"],
+                       help="Agent type to use")
+    parser.add_argument("--model", type=str, default="gpt-4o-mini",
+                       help="LLM model name (e.g., gpt-4o, gpt-4o-mini, qwen2.5-7b-instruct)")
+
+    # Experiment settings
+    parser.add_argument("--episodes", type=int, default=5,
+                       help="Number of episodes to run")
+    parser.add_argument("--max_steps", type=int, default=50,
+                       help="Maximum steps per episode")
+    parser.add_argument("--log_dir", type=str, default="logs",
+                       help="Directory to save logs")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Print detailed execution logs")
+    parser.add_argument("--verbose-tokens", action="store_true",
+                       help="Print detailed token usage for each LLM call")
+    parser.add_argument("--concurrency", type=int, default=1,
+                       help="Number of episodes to run in parallel (one agent/env per worker)")
+    parser.add_argument("--speculative-samples", type=int, default=1,
+                       help="Action calls sampled concurrently per step; the first well-formed one is used")
+    parser.add_argument("--response-cache", action="store_true",
+                       help="Reuse an agent's responses to identical requests within an episode "
+                            "(cached responses are not counted as tokens)")
+    parser.add_argument("--plan-cache", type=str, default=None,
+                       help="SQLite file caching ZipAct initial plans of solved task families")
+    parser.add_argument("--compact-state", action="store_true",
+                       help="Send ZipAct's state as compact JSON (fewer input tokens)")
+    parser.add_argument("--overlap-updates", action="store_true",
+                       help="Run ZipAct's actor concurrently with its state update (speculative)")
+    parser.add_argument("--structured-actions", action="store_true",
+                       help="Ask ZipAct's actor for short {\"t\", \"a\"} JSON via structured output")
+    parser.add_argument("--guided-actions", action="store_true",
+                       help="Like --structured-actions, constraining ZipAct's action to the admissible commands")
+    parser.add_argument("--updater-model", type=str, default=None,
+                       help="Smaller model drafting ZipAct's state updates (main model only on a bad draft)")
+    parser.add_argument("--combined-step", action="store_true",
+                       help="Update ZipAct's state and choose the action in one LLM call per step "
+                            "(not with --structured-actions, --guided-actions, --action-first or --overlap-updates)")
+    parser.add_argument("--max-attempted-actions", type=int, default=None,
+                       help="Keep only the N most recent entries of ZipAct's attempted_actions")
+    parser.add_argument("--actor-examples", type=int, default=None,
+                       help="Keep only the first N worked examples in ZipAct's actor prompt")
+    parser.add_argument("--json-state", action="store_true",
+                       help="Request ZipAct's state updates in JSON mode, without the state skeleton in the prompt")
+    parser.add_argument("--action-first", action="store_true",
+                       help="ZipAct's actor writes the action first and stops decoding after it")
+    parser.add_argument("--warm-prefix", action="store_true",
+                       help="Send the system prompts once before the episodes to warm the server prefix cache")
+
+    # API settings
+    parser.add_argument("--api_key", type=str, default=None,
+                       help="OpenAI API key (or set OPENAI_API_KEY env variable)")
+    parser.add_argument("--base_url", type=str, default=None,
+                       help="OpenAI API base URL (for compatible endpoints)")
+    parser.add_argument("--prompt-cache", action="store_true",
+                       help="Mark system prompts with cache_control (providers with explicit prompt caching)")
+
+    return parser
+
+
+def add_sciworld_args(parser: argparse.ArgumentParser):
+    """Add the SciWorld env options (runners that can run SciWorld)."""
+    parser.add_argument("--step-cache-size", type=int, default=0,
+                       help="SciWorld step results to cache by trajectory, reused by repeated episodes (0 = off)")
+
+
+def agent_kwargs(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    get_agent keyword arguments from parsed common_parser() options
+    (get_agent drops the ones the chosen agent does not take).
+    """
+    return dict(
+        max_steps=args.max_steps,
+        verbose=args.verbose,
+        speculative_samples=args.speculative_samples,
+        response_cache=args.response_cache,
+        plan_cache=args.plan_cache,
+        compact_state=args.compact_state,
+        overlap_updates=args.overlap_updates,
+        structured_actions=args.structured_actions,
+        guided_actions=args.guided_actions,
+        updater_model=args.updater_model,
+        combined_step=args.combined_step,
+        max_attempted_actions=args.max_attempted_actions,
+        actor_examples=args.actor_examples,
+        json_state=args.json_state,
+        action_first=args.action_first,
+    )
+
+
+# Options whose output format or control flow --combined-step replaces
+COMBINED_STEP_CONFLICTS = ("structured_actions", "guided_actions", "action_first", "overlap_updates")
+
+
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Exit with a usage error for option combinations the agents reject."""
+    if args.combined_step:
+        conflicts = ["--" + name.replace("_", "-") for name in COMBINED_STEP_CONFLICTS if getattr(args, name)]
+        if conflicts:
+            parser.error(f"--combined-step cannot be used with {', '.join(conflicts)}")
@@ -1,3 +1,4 @@
+import copy
 import os
 import re
 import yaml
@@ -6,13 +7,34 @@ import alfworld.agents.environment as environment
 from typing import Tuple, Dict
 from .base import BaseEnv
 
+# "Your task is to: ..." line of the initial observation
+TASK_RE = re.compile(r'Your task is to:\s*(.+?)(?:\n|$)', re.IGNORECASE)
+
+# libyaml's C loader when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Parsed configs by (path, mtime), reused by envs built in the same process
+_CONFIG_CACHE: Dict[Tuple[str, float], dict] = {}
+
+
+def _load_config(path: str) -> dict:
+    """Parse a YAML config (once per file version); returns a copy the caller may modify."""
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
+        with open(path) as f:
+            config = _CONFIG_CACHE[key] = yaml.load(f, Loader=_YAML_LOADER)
+    return copy.deepcopy(config)
+
+
 class ALFWorldEnv(BaseEnv):
     """
     Wrapper for ALFWorld environment.
     ALFWorld is a text-based embodied AI environment for household tasks.
     """
     
-    def __init__(self, config_path: str = None, split: str = "eval_out_of_distribution", seed: int = 42):
+    def __init__(self, config_path: str = None, split: str = "eval_out_of_distribution", seed: int = 42,
+                 shard: int = 0, num_shards: int = 1):
         """
         Initialize ALFWorld environment.
         
@@ -20,7 +42,14 @@ class ALFWorldEnv(BaseEnv):
             config_path: Path to config yaml file. If None, use default config.
             split: Which split to use ('train', 'eval_out_of_distribution', 'eval_in_distribution')
             seed: Random seed
+            shard: Index of this env's share of the split's games
+            num_shards: Number of envs the games are split across. Concurrent
+                workers get one shard each, so they never replay each
+                other's games.
         """
+        if not 0 <= shard < num_shards:
+            raise ValueError(f"shard must be in [0, {num_shards}), got {shard}")
+
         # Load configuration
         if config_path is None:
             # Use default config from alfworld package
@@ -42,23 +71,33 @@ class ALFWorldEnv(BaseEnv):
                     }
                 }
             else:
-                with open(config_path) as f:
-                    self.config = yaml.safe_load(f)
-                    self.config['general']['train_eval'] = split
-                    self.config['general']['random_seed'] = seed
-        else:
-            with open(config_path) as f:
-                self.config = yaml.safe_load(f)
+                self.config = _load_config(config_path)
                 self.config['general']['train_eval'] = split
+                self.config['general']['random_seed'] = seed
+        else:
+            self.config = _load_config(config_path)
+            self.config['general']['train_eval'] = split
         
         # Initialize environment
         env_type = self.config['env']['type']
         self.env = getattr(environment, env_type)(self.config, train_eval=split)
+        if num_shards > 1:
+            self._shard_games(shard, num_shards)
         self.env = self.env.init_env(batch_size=1)
         
         self.current_task = None
         self.admissible_commands = []
     
+    def _shard_games(self, shard: int, num_shards: int):
+        """Keep every num_shards-th game file, starting at shard."""
+        game_files = self.env.game_files[shard::num_shards]
+        if not game_files:
+            raise ValueError(
+                f"split has {len(self.env.game_files)} games, too few for {num_shards} shards"
+            )
+        self.env.game_files = game_files
+        self.env.num_games = len(game_files)
+    
     def reset(self) -> Tuple[str, Dict]:
         """
         Reset environment and return initial observation.
@@ -115,7 +154,7 @@ class ALFWorldEnv(BaseEnv):
         #  Your task is to: put a clean apple in refrigerator."
         
         # Try to extract "Your task is to: ..." pattern
-        task_match = re.search(r'Your task is to:\s*(.+?)(?:\n|$)', observation, re.IGNORECASE)
+        task_match = TASK_RE.search(observation)
         if task_match:
             return task_match.group(1).strip()
         
@@ -3,11 +3,45 @@ Simplified ALFWorld Environment for testing without full installation.
 Uses a simulated household task interaction pattern similar to ALFWorld.
 """
 
-import re
-from typing import Tuple, Dict, List
+from typing import Callable, Dict, List, Optional, Tuple
 from .base import BaseEnv
 
 
+# Argument parsers for _execute_action. Each takes the text after the
+# action verb (first line only) and returns the handler arguments, or None
+# if it is malformed. They accept exactly what the simulator's former
+# regexes did, e.g. "take (.+) from (.+)" splits at the last " from " that
+# is followed by an argument.
+
+def _one_arg(rest: str) -> Optional[Tuple[str]]:
+    return (rest.strip(),) if rest else None
+
+
+def _prefixed_arg(prefix: str) -> Callable[[str], Optional[Tuple[str]]]:
+    """Parser for "<verb> <prefix><arg>", e.g. "go to X" or "look at X"."""
+    n = len(prefix)
+    
+    def parse(rest: str) -> Optional[Tuple[str]]:
+        return (rest[n:].strip(),) if len(rest) > n and rest.startswith(prefix) else None
+    return parse
+
+
+def _two_args(*separators: str) -> Callable[[str], Optional[Tuple[str, str]]]:
+    """
+    Parser for "<verb> <arg> <separator> <arg>", split at the last
+    separator with a non-empty argument after it.
+    """
+    def parse(rest: str) -> Optional[Tuple[str, str]]:
+        idx, sep = max((rest.rfind(sep), sep) for sep in separators)
+        if idx + len(sep) == len(rest):
+            # Separator at the very end, e.g. "take x from from ": use an earlier one
+            idx, sep = max((rest.rfind(s, 0, idx - 1 + len(s)), s) for s in separators)
+        if idx < 1:
+            return None
+        return rest[:idx].strip(), rest[idx + len(sep):].strip()
+    return parse
+
+
 class ALFWorldSimpleEnv(BaseEnv):
     """
     Simplified ALFWorld environment that simulates household tasks.
@@ -48,6 +82,15 @@ class ALFWorldSimpleEnv(BaseEnv):
         "needs_open": ["fridge 1", "microwave 1", "cabinet 1", "cabinet 2", "cabinet 3", "cabinet 4", "cabinet 5", "cabinet 6"],
     }
     
+    # Receptacles that must be opened first (set for membership tests)
+    _NEEDS_OPEN = frozenset(TASK_DATA["needs_open"])
+    
+    # Static part of the admissible commands
+    _GO_TO_COMMANDS = tuple(f"go to {loc}" for loc in TASK_DATA["locations"])
+    
+    # Position of each openable receptacle's open/close command
+    _OPEN_INDEX = {recep: i for i, recep in enumerate(TASK_DATA["needs_open"])}
+    
     def __init__(self, task_id: int = 0, max_steps: int = 30):
         """
         Initialize the simplified ALFWorld environment.
@@ -72,8 +115,17 @@ class ALFWorldSimpleEnv(BaseEnv):
         self.done = False
         self.success = False
         
-        # Deep copy locations to avoid modifying original
-        self.locations = {k: list(v) for k, v in self.TASK_DATA["locations"].items()}
+        # Copy locations to avoid modifying the original. Each receptacle's
+        # contents are an insertion-ordered dict used as an ordered set, so
+        # membership and removal are O(1) and listings keep their order.
+        self.locations = {k: dict.fromkeys(v) for k, v in self.TASK_DATA["locations"].items()}
+        
+        # Admissible commands, kept in parts that are rebuilt only when the
+        # state they depend on changes (None = rebuild on next request)
+        self._open_close_commands = [f"open {recep}" for recep in self.TASK_DATA["needs_open"]]
+        self._take_commands = None
+        self._inventory_commands = None
+        self._commands = None
         
         task = self.TASK_DATA["task"]
         initial_obs = self.TASK_DATA["initial_obs"]
@@ -123,65 +175,13 @@ class ALFWorldSimpleEnv(BaseEnv):
     
     def _execute_action(self, action: str) -> str:
         """Execute an action and return observation."""
-        
-        # go to {recep}
-        go_match = re.match(r"go to (.+)", action)
-        if go_match:
-            location = go_match.group(1).strip()
-            return self._go_to(location)
-        
-        # take {obj} from {recep}
-        take_match = re.match(r"take (.+) from (.+)", action)
-        if take_match:
-            obj = take_match.group(1).strip()
-            recep = take_match.group(2).strip()
-            return self._take(obj, recep)
-        
-        # put {obj} in/on {recep}
-        put_match = re.match(r"put (.+) (?:in|on|in/on) (.+)", action)
-        if put_match:
-            obj = put_match.group(1).strip()
-            recep = put_match.group(2).strip()
-            return self._put(obj, recep)
-        
-        # open {recep}
-        open_match = re.match(r"open (.+)", action)
-        if open_match:
-            recep = open_match.group(1).strip()
-            return self._open(recep)
-        
-        # close {recep}
-        close_match = re.match(r"close (.+)", action)
-        if close_match:
-            recep = close_match.group(1).strip()
-            return self._close(recep)
-        
-        # heat {obj} with {recep}
-        heat_match = re.match(r"heat (.+) with (.+)", action)
-        if heat_match:
-            obj = heat_match.group(1).strip()
-            recep = heat_match.group(2).strip()
-            return self._heat(obj, recep)
-        
-        # cool {obj} with {recep}
-        cool_match = re.match(r"cool (.+) with (.+)", action)
-        if cool_match:
-            obj = cool_match.group(1).strip()
-            recep = cool_match.group(2).strip()
-            return self._cool(obj, recep)
-        
-        # clean {obj} with {recep}
-        clean_match = re.match(r"clean (.+) with (.+)", action)
-        if clean_match:
-            obj = clean_match.group(1).strip()
-            recep = clean_match.group(2).strip()
-            return self._clean(obj, recep)
-        
-        # examine/look at
-        examine_match = re.match(r"(?:examine|look at) (.+)", action)
-        if examine_match:
-            target = examine_match.group(1).strip()
-            return self._examine(target)
+        verb, _, rest = action.partition("\n")[0].partition(" ")
+        entry = self._ACTIONS.get(verb)
+        if entry:
+            parse, handler = entry
+            args = parse(rest)
+            if args is not None:
+                return handler(self, *args)
         
         return "Nothing happened."
     
@@ -191,9 +191,10 @@ class ALFWorldSimpleEnv(BaseEnv):
             return "Nothing happened."
         
         self.current_location = location
+        self._commands_changed(take=True)
         
         # Check if location needs to be opened
-        if location in self.TASK_DATA["needs_open"] and location not in self.open_receptacles:
+        if location in self._NEEDS_OPEN and location not in self.open_receptacles:
             return f"The {location} is closed."
         
         items = self.locations[location]
@@ -211,12 +212,13 @@ class ALFWorldSimpleEnv(BaseEnv):
         if recep not in self.locations:
             return "Nothing happened."
         
-        if recep in self.TASK_DATA["needs_open"] and recep not in self.open_receptacles:
+        if recep in self._NEEDS_OPEN and recep not in self.open_receptacles:
             return "Nothing happened."  # Need to open first
         
         if obj in self.locations[recep]:
-            self.locations[recep].remove(obj)
+            del self.locations[recep][obj]
             self.inventory.append(obj)
+            self._commands_changed(take=True, inventory=True)
             return f"You pick up the {obj} from the {recep}."
         
         return "Nothing happened."
@@ -229,11 +231,12 @@ class ALFWorldSimpleEnv(BaseEnv):
         if recep not in self.locations:
             return "Nothing happened."
         
-        if recep in self.TASK_DATA["needs_open"] and recep not in self.open_receptacles:
+        if recep in self._NEEDS_OPEN and recep not in self.open_receptacles:
             return "Nothing happened."  # Need to open first
         
         self.inventory.remove(obj)
-        self.locations[recep].append(obj)
+        self.locations[recep][obj] = None
+        self._commands_changed(take=True, inventory=True)
         
         # Check win condition: heated mug in cabinet
         task = self.TASK_DATA["task"]
@@ -250,7 +253,7 @@ class ALFWorldSimpleEnv(BaseEnv):
         if recep not in self.locations:
             return "Nothing happened."
         
-        if recep not in self.TASK_DATA["needs_open"]:
+        if recep not in self._NEEDS_OPEN:
             return "Nothing happened."  # Can't open this
         
         if recep in self.open_receptacles:
@@ -258,6 +261,8 @@ class ALFWorldSimpleEnv(BaseEnv):
         
         self.open_receptacles.add(recep)
         self.current_location = recep
+        self._open_close_commands[self._OPEN_INDEX[recep]] = f"close {recep}"
+        self._commands_changed(take=True)
         
         items = self.locations[recep]
         if items:
@@ -268,13 +273,15 @@ class ALFWorldSimpleEnv(BaseEnv):
     
     def _close(self, recep: str) -> str:
         """Close a receptacle."""
-        if recep not in self.TASK_DATA["needs_open"]:
+        if recep not in self._NEEDS_OPEN:
             return "Nothing happened."
         
         if recep not in self.open_receptacles:
             return f"The {recep} is already closed."
         
         self.open_receptacles.discard(recep)
+        self._open_close_commands[self._OPEN_INDEX[recep]] = f"open {recep}"
+        self._commands_changed()
         return f"You close the {recep}."
     
     def _heat(self, obj: str, recep: str) -> str:
@@ -326,37 +333,67 @@ class ALFWorldSimpleEnv(BaseEnv):
         
         return "Nothing happened."
     
+    def _commands_changed(self, take: bool = False, inventory: bool = False):
+        """Drop the cached admissible-command parts a state change invalidated."""
+        self._commands = None
+        if take:
+            self._take_commands = None
+        if inventory:
+            self._inventory_commands = None
+    
     def _get_admissible_commands(self) -> List[str]:
         """Get list of valid commands (simplified)."""
-        commands = []
-        
-        # Go to locations
-        for loc in self.locations.keys():
-            commands.append(f"go to {loc}")
-        
-        # Open/close receptacles
-        for recep in self.TASK_DATA["needs_open"]:
-            if recep in self.open_receptacles:
-                commands.append(f"close {recep}")
-            else:
-                commands.append(f"open {recep}")
-        
-        # Take objects from current location
-        if self.current_location and not self.inventory:
-            for obj in self.locations.get(self.current_location, []):
-                commands.append(f"take {obj} from {self.current_location}")
-        
-        # Put/heat/cool/clean with inventory
-        if self.inventory:
-            obj = self.inventory[0]
-            for loc in self.locations.keys():
-                commands.append(f"put {obj} in/on {loc}")
-            commands.append(f"heat {obj} with microwave 1")
-            commands.append(f"cool {obj} with fridge 1")
-            commands.append(f"clean {obj} with sinkbasin 1")
-        
-        return commands
+        if self._commands is None:
+            # Take objects from current location
+            if self._take_commands is None:
+                location = self.current_location
+                if location and not self.inventory:
+                    self._take_commands = [f"take {obj} from {location}" for obj in self.locations.get(location, ())]
+                else:
+                    self._take_commands = []
+            
+            # Put/heat/cool/clean with inventory
+            if self._inventory_commands is None:
+                if self.inventory:
+                    obj = self.inventory[0]
+                    self._inventory_commands = [f"put {obj} in/on {loc}" for loc in self.locations]
+                    self._inventory_commands += [
+                        f"heat {obj} with microwave 1",
+                        f"cool {obj} with fridge 1",
+                        f"clean {obj} with sinkbasin 1",
+                    ]
+                else:
+                    self._inventory_commands = []
+            
+            # Go to locations, open/close receptacles, then the parts above
+            self._commands = [
+                *self._GO_TO_COMMANDS,
+                *self._open_close_commands,
+                *self._take_commands,
+                *self._inventory_commands,
+            ]
+        
+        # Callers get their own copy of the cached list
+        return list(self._commands)
+    
+    def get_admissible_commands(self) -> List[str]:
+        """Return list of admissible commands."""
+        return self._get_admissible_commands()
     
     def get_task_description(self) -> str:
         """Get the current task description."""
         return self.TASK_DATA["task"]
+    
+    # Action verb -> (argument parser, handler), looked up by _execute_action
+    _ACTIONS = {
+        "go": (_prefixed_arg("to "), _go_to),                     # go to {recep}
+        "take": (_two_args(" from "), _take),                     # take {obj} from {recep}
+        "put": (_two_args(" in ", " on ", " in/on "), _put),      # put {obj} in/on {recep}
+        "open": (_one_arg, _open),                                # open {recep}
+        "close": (_one_arg, _close),                              # close {recep}
+        "heat": (_two_args(" with "), _heat),                     # heat {obj} with {recep}
+        "cool": (_two_args(" with "), _cool),                     # cool {obj} with {recep}
+        "clean": (_two_args(" with "), _clean),                   # clean {obj} with {recep}
+        "examine": (_one_arg, _examine),                          # examine {target}
+        "look": (_prefixed_arg("at "), _examine),                 # look at {target}
+    }
@@ -5,10 +5,49 @@ SciWorld is a text-based environment for scientific reasoning tasks.
 Install: pip install scienceworld
 """
 
+import hashlib
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Tuple, Dict, List, Optional
 from .base import BaseEnv
 
+try:
+    from py4j.protocol import Py4JError
+except ImportError:
+    # py4j comes with scienceworld; without it no simulator call can run
+    Py4JError = RuntimeError
+
+# Errors of a failed simulator query (Java exceptions arrive as Py4JError)
+SIMULATOR_ERRORS = (Py4JError, RuntimeError, AttributeError)
+
+# "Task: ..." line of an observation (fallback task extraction)
+TASK_RE = re.compile(r'Task:\s*(.+?)(?:\n|$)', re.IGNORECASE)
+
+# Simulator used only for class-level queries (variation counts); starting
+# one launches a JVM, so it is created once and shared
+_query_env = None
+_query_env_lock = threading.Lock()
+
+
+def _get_query_env():
+    """The shared query ScienceWorldEnv (created on first use)."""
+    global _query_env
+    with _query_env_lock:
+        if _query_env is None:
+            from scienceworld import ScienceWorldEnv
+            _query_env = ScienceWorldEnv("")
+        return _query_env
+
+
+@lru_cache(maxsize=None)
+def _num_variations(task_name: str) -> int:
+    """Variation count of a SciWorld task (fixed per task, so memoized)."""
+    env = _get_query_env()
+    with _query_env_lock:
+        return env.getNumVariations(task_name)
+
 
 class SciWorldEnv(BaseEnv):
     """
@@ -57,7 +96,8 @@ class SciWorldEnv(BaseEnv):
         task_name: str = "boil", 
         variation_idx: int = 0,
         simplifications_preset: str = "easy",
-        seed: int = 42
+        seed: int = 42,
+        step_cache_size: int = 0
     ):
         """
         Initialize SciWorld environment.
@@ -67,6 +107,12 @@ class SciWorldEnv(BaseEnv):
             variation_idx: Task variation index (different scenarios for same task)
             simplifications_preset: Difficulty level ('easy', 'medium', 'hard')
             seed: Random seed
+            step_cache_size: Number of step results to cache, keyed by the
+                action sequence since reset (0 disables). A step that repeats
+                an earlier trajectory, e.g. a retried episode of the same
+                variation, is answered from the cache; the simulator is only
+                brought up to date (reset + replay) when a new action follows
+                or it is queried. Assumes the task variation is deterministic.
         """
         try:
             from scienceworld import ScienceWorldEnv
@@ -92,6 +138,16 @@ class SciWorldEnv(BaseEnv):
         self.task_description = ""
         self.max_score = 0
         self.current_score = 0
+        # (task description, max score) of the loaded variation, fetched on
+        # the first reset; both are fixed once the task is loaded
+        self._task_info = None
+        
+        # Step cache (see step_cache_size)
+        self.step_cache_size = step_cache_size
+        self._step_cache = OrderedDict()
+        self._actions = []      # Actions since reset
+        self._trajectory = b""  # Cache key of the current trajectory
+        self._lagging = False   # Whether self.env is behind self._actions
     
     def reset(self) -> Tuple[str, Dict]:
         """
@@ -104,10 +160,16 @@ class SciWorldEnv(BaseEnv):
         obs, info = self.env.reset()
         
         # Get task description
-        self.task_description = self.env.taskdescription()
+        if self._task_info is None:
+            self._task_info = (self.env.taskdescription(), self.env.getMaxScore())
+        self.task_description, self.max_score = self._task_info
         self.current_task = self._extract_task(obs, self.task_description)
-        self.max_score = self.env.getMaxScore()
         self.current_score = 0
+        self._actions = []
+        self._trajectory = self._trajectory_key(
+            b"", f"{self.task_name}\0{self.variation_idx}\0{self.simplifications_preset}"
+        )
+        self._lagging = False
         
         info = {
             'task': self.current_task,
@@ -131,6 +193,37 @@ class SciWorldEnv(BaseEnv):
             done: Whether episode is finished
             info: Additional information
         """
+        if self.step_cache_size:
+            return self._cached_step(action)
+        return self._step_uncached(action)
+    
+    @staticmethod
+    def _trajectory_key(parent: bytes, action: str) -> bytes:
+        """Key of the trajectory parent followed by action."""
+        return hashlib.blake2b(parent + b"\0" + action.encode("utf-8"), digest_size=16).digest()
+    
+    def _cached_step(self, action: str) -> Tuple[str, float, bool, Dict]:
+        """step() through the step cache."""
+        key = self._trajectory_key(self._trajectory, action)
+        cached = self._step_cache.get(key)
+        if cached is None:
+            self._sync()
+            obs, reward, done, info = self._step_uncached(action)
+            self._step_cache[key] = ((obs, reward, done, dict(info)), self.current_score)
+            if len(self._step_cache) > self.step_cache_size:
+                self._step_cache.popitem(last=False)
+        else:
+            self._step_cache.move_to_end(key)
+            (obs, reward, done, info), self.current_score = cached
+            info = dict(info)
+            self._lagging = True
+        
+        self._actions.append(action)
+        self._trajectory = key
+        return obs, reward, done, info
+    
+    def _step_uncached(self, action: str) -> Tuple[str, float, bool, Dict]:
+        """Step the simulator itself."""
         obs, reward, done, info = self.env.step(action)
         
         # Update current score
@@ -147,6 +240,15 @@ class SciWorldEnv(BaseEnv):
         
         return obs, normalized_reward, done, info
     
+    def _sync(self):
+        """Bring the simulator to the current trajectory after cached steps."""
+        if not self._lagging:
+            return
+        self.env.reset()
+        for action in self._actions:
+            self.env.step(action)
+        self._lagging = False
+    
     def _extract_task(self, observation: str, task_description: str) -> str:
         """Extract the task description."""
         # Use the task description from the environment
@@ -154,7 +256,7 @@ class SciWorldEnv(BaseEnv):
             return task_description.strip()
         
         # Fallback: try to extract from observation
-        task_match = re.search(r'Task:\s*(.+?)(?:\n|$)', observation, re.IGNORECASE)
+        task_match = TASK_RE.search(observation)
         if task_match:
             return task_match.group(1).strip()
         
@@ -167,30 +269,34 @@ class SciWorldEnv(BaseEnv):
     
     def get_valid_actions(self) -> List[str]:
         """Return list of valid actions."""
+        self._sync()
         try:
             return self.env.getValidActionObjectCombinations()
-        except:
+        except SIMULATOR_ERRORS:
             return []
     
     def get_valid_action_templates(self) -> List[str]:
         """Return list of valid action templates."""
+        self._sync()
         try:
             return self.env.getValidActionObjectCombinationsTemplates()
-        except:
+        except SIMULATOR_ERRORS:
             return []
     
     def get_look(self) -> str:
         """Get description of current location."""
+        self._sync()
         try:
             return self.env.look()
-        except:
+        except SIMULATOR_ERRORS:
             return ""
     
     def get_inventory(self) -> str:
         """Get current inventory."""
+        self._sync()
         try:
             return self.env.inventory()
-        except:
+        except SIMULATOR_ERRORS:
             return ""
     
     def get_score(self) -> Tuple[int, int]:
@@ -206,9 +312,7 @@ class SciWorldEnv(BaseEnv):
     def get_num_variations(cls, task_name: str) -> int:
         """Get number of variations for a task."""
         try:
-            from scienceworld import ScienceWorldEnv
-            env = ScienceWorldEnv("")
-            return env.getNumVariations(task_name)
-        except:
+            return _num_variations(task_name)
+        except (ImportError, OSError, *SIMULATOR_ERRORS):
             return 0
 
@@ -9,6 +9,18 @@ import re
 from typing import Tuple, Dict, List, Optional
 from .base import BaseEnv
 
+# Instruction formats of WebShop observations, tried in order, each with
+# the lowercase literal any match must contain
+TASK_PATTERNS = tuple(
+    (literal, re.compile(pattern, re.IGNORECASE | re.DOTALL)) for literal, pattern in (
+        ("instruction:", r'Instruction:\s*\[(.+?)\]'),
+        ("instruction:", r'Instruction:\s*(.+?)(?:\n|$)'),
+        ("goal:", r'Goal:\s*(.+?)(?:\n|$)'),
+        ("i need", r'I need\s+(.+?)(?:\n|$)'),
+        ("find", r'Find\s+(.+?)(?:\n|$)'),
+    )
+)
+
 
 class WebShopEnv(BaseEnv):
     """
@@ -139,24 +151,23 @@ class WebShopEnv(BaseEnv):
     
     def _extract_task(self, observation: str) -> str:
         """Extract the task/goal from the observation."""
-        # WebShop instructions usually in specific format
-        patterns = [
-            r'Instruction:\s*\[(.+?)\]',
-            r'Instruction:\s*(.+?)(?:\n|$)',
-            r'Goal:\s*(.+?)(?:\n|$)',
-            r'I need\s+(.+?)(?:\n|$)',
-            r'Find\s+(.+?)(?:\n|$)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, observation, re.IGNORECASE | re.DOTALL)
+        # WebShop instructions usually in specific format. In ASCII text a
+        # pattern can only match if its literal occurs, so patterns whose
+        # literal is absent are skipped (non-ASCII text may match through
+        # case folding, so it tries every pattern)
+        lowered = observation.lower() if observation.isascii() else None
+        for literal, pattern in TASK_PATTERNS:
+            if lowered is not None and literal not in lowered:
+                continue
+            match = pattern.search(observation)
             if match:
                 return match.group(1).strip()
         
-        # Fallback: first line
-        lines = [line.strip() for line in observation.split('\n') if line.strip()]
-        if lines:
-            return lines[0]
+        # Fallback: first non-empty line (leading blank lines are stripped
+        # with the leading whitespace, so only that line is scanned)
+        first_line = observation.lstrip().partition('\n')[0].strip()
+        if first_line:
+            return first_line
         
         return "Find and purchase the requested product"
     
@@ -1,7 +1,30 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import openai
 from typing import List, Dict, Any, Optional, Tuple
-import tiktoken
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """
+    Tokenizer used to estimate token counts for model. Built once per
+    model name and shared by all clients (loading a BPE table is slow);
+    tiktoken itself is only imported on first use.
+    """
+    import tiktoken
+    
+    try:
+        if "gpt-4" in model.lower():
+            return tiktoken.encoding_for_model("gpt-4")
+        elif "gpt-3.5" in model.lower():
+            return tiktoken.encoding_for_model("gpt-3.5-turbo")
+    except Exception:
+        pass
+    # For Qwen or other models, use cl100k_base as approximation
+    return tiktoken.get_encoding("cl100k_base")
+
 
 class LLMClient:
     """
@@ -9,8 +32,14 @@ class LLMClient:
     compatible APIs (Qwen-2.5-7B/32B-Instruct via OpenAI-compatible endpoints).
     
     Tracks token usage for cost analysis.
+    
+    Agents keep the system prompt and the start of the user prompt
+    byte-identical across steps, so providers with automatic prefix caching
+    (OpenAI, vLLM) reuse them. With prompt_cache=True, system messages are
+    also sent as cache_control blocks for providers that need explicit
+    cache breakpoints (Anthropic-style, e.g. via an OpenAI-compatible gateway).
     """
-    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None, base_url: Optional[str] = None, verbose: bool = False):
+    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None, base_url: Optional[str] = None, verbose: bool = False, prompt_cache: bool = False):
         self.model = model
         self.client = openai.OpenAI(
             api_key=api_key or os.getenv("OPENAI_API_KEY"),
@@ -22,30 +51,41 @@ class LLMClient:
         self.total_output_tokens = 0
         self.call_count = 0  # Track number of LLM calls
         self.verbose = verbose  # Whether to print token usage per call
+        self.prompt_cache = prompt_cache  # Whether to mark system prompts with cache_control
+        self._token_lock = threading.Lock()  # Guards the counters above
+        self._line_tokens: Dict[str, int] = {}  # Per-line token counts for usage estimates
+        self._system_tokens: Dict[str, int] = {}  # Per-system-prompt token counts
         
-        # Initialize tokenizer for token estimation
-        try:
-            if "gpt-4" in model.lower():
-                self.encoding = tiktoken.encoding_for_model("gpt-4")
-            elif "gpt-3.5" in model.lower():
-                self.encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-            else:
-                # For Qwen or other models, use cl100k_base as approximation
-                self.encoding = tiktoken.get_encoding("cl100k_base")
-        except:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
+        # Tokenizer for token estimation, built on first use (responses
+        # with usage never need it)
+        self._encoding = None
 
-    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.0, max_tokens: int = 512, stop: Optional[List[str]] = None) -> str:
-        """Generate completion and track token usage."""
+    @property
+    def encoding(self):
+        """tiktoken encoding used for local token counts."""
+        if self._encoding is None:
+            self._encoding = _get_encoding(self.model)
+        return self._encoding
+    
+    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.0, max_tokens: int = 512, stop: Optional[List[str]] = None, response_format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate completion and track token usage.
+        
+        response_format is passed to the API as is (e.g. a json_schema format
+        for structured output); None leaves the output unconstrained.
+        """
         try:
-            self.call_count += 1
+            with self._token_lock:
+                self.call_count += 1
             
+            extra = {"response_format": response_format} if response_format else {}
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self._with_cache_control(messages) if self.prompt_cache else messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                stop=stop
+                stop=stop,
+                **extra
             )
             
             # Track token usage for this call
@@ -61,9 +101,10 @@ class LLMClient:
             current_total = current_input_tokens + current_output_tokens
             
             # Update cumulative totals
-            self.total_input_tokens += current_input_tokens
-            self.total_output_tokens += current_output_tokens
-            cumulative_total = self.total_input_tokens + self.total_output_tokens
+            with self._token_lock:
+                self.total_input_tokens += current_input_tokens
+                self.total_output_tokens += current_output_tokens
+                cumulative_total = self.total_input_tokens + self.total_output_tokens
             
             # Print token usage if verbose mode is enabled
             if self.verbose:
@@ -78,15 +119,103 @@ class LLMClient:
             print(f"Error calling LLM: {e}")
             return ""
     
+    # Upper bound on concurrent requests of one chat_many call
+    CHAT_MANY_MAX_WORKERS = 16
+    
+    def chat_many(self, batch: List[List[Dict[str, str]]], temperature: float = 0.0, max_tokens: int = 512, stop: Optional[List[str]] = None, response_format: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        Send independent requests concurrently (one thread each, up to
+        CHAT_MANY_MAX_WORKERS) and return their responses in batch order.
+        Total latency is about that of the slowest request instead of the sum.
+        """
+        if len(batch) <= 1:
+            return [self.chat(messages, temperature, max_tokens, stop, response_format) for messages in batch]
+        with ThreadPoolExecutor(max_workers=min(self.CHAT_MANY_MAX_WORKERS, len(batch))) as ex:
+            futures = [ex.submit(self.chat, messages, temperature, max_tokens, stop, response_format) for messages in batch]
+            return [future.result() for future in futures]
+    
+    @staticmethod
+    def _with_cache_control(messages: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """Return messages with each system prompt as a cacheable content block."""
+        return [
+            {
+                "role": "system",
+                "content": [{"type": "text", "text": m["content"], "cache_control": {"type": "ephemeral"}}]
+            } if m["role"] == "system" else m
+            for m in messages
+        ]
+    
+    def count_tokens(self, text: str) -> int:
+        """Count tokens in a plain string with this client's tokenizer."""
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    # Distinct lines kept in _line_tokens before it is cleared
+    LINE_TOKEN_CACHE_SIZE = 50000
+    
+    def _estimate_text_tokens(self, texts: List[str]) -> int:
+        """
+        Approximate total token count of texts: the sum of their lines'
+        counts plus one per newline. Line counts are cached, so an agent
+        prompt whose history grows by a few lines per step costs only the
+        new lines to encode rather than the whole prompt; those are encoded
+        in one encode_batch call.
+        """
+        cache = self._line_tokens
+        if len(cache) > self.LINE_TOKEN_CACHE_SIZE:
+            cache.clear()
+        lines = [line for text in texts for line in text.split("\n")]
+        counts = {}
+        missing = []
+        for line in dict.fromkeys(lines):
+            count = cache.get(line)
+            if count is None:
+                missing.append(line)
+            else:
+                counts[line] = count
+        if missing:
+            for line, tokens in zip(missing, self.encoding.encode_batch(missing, disallowed_special=())):
+                counts[line] = cache[line] = len(tokens)
+        return sum(counts[line] for line in lines) + len(lines) - len(texts)
+    
+    # Distinct system prompts kept in _system_tokens before it is cleared
+    SYSTEM_TOKEN_CACHE_SIZE = 256
+    
     def _count_tokens(self, messages: List[Dict[str, str]]) -> int:
-        """Estimate token count for messages."""
-        num_tokens = 0
+        """
+        Estimate token count for messages (used when a response has no usage).
+        
+        System prompts repeat verbatim across calls, so their whole counts
+        are cached and they skip the per-line pass.
+        """
+        # Every message follows <im_start>{role/name}\n{content}<im_end>\n (4 tokens),
+        # and every reply is primed with <im_start>assistant (2 tokens)
+        system_cache = self._system_tokens
+        if len(system_cache) > self.SYSTEM_TOKEN_CACHE_SIZE:
+            system_cache.clear()
+        total = 4 * len(messages) + 2
+        values = []
         for message in messages:
-            num_tokens += 4  # Every message follows <im_start>{role/name}\n{content}<im_end>\n
+            system = message.get("role") == "system"
             for key, value in message.items():
-                num_tokens += len(self.encoding.encode(value))
-        num_tokens += 2  # Every reply is primed with <im_start>assistant
-        return num_tokens
+                if system and key == "content":
+                    count = system_cache.get(value)
+                    if count is None:
+                        count = system_cache[value] = self._estimate_text_tokens([value])
+                    total += count
+                else:
+                    values.append(value)
+        return total + self._estimate_text_tokens(values)
+    
+    def for_model(self, model: str) -> "LLMClient":
+        """A client for another model on the same endpoint, with its own token counters."""
+        return LLMClient(model=model, api_key=self.client.api_key, base_url=str(self.client.base_url),
+                         verbose=self.verbose, prompt_cache=self.prompt_cache)
+    
+    def add_token_usage(self, input_tokens: int, output_tokens: int):
+        """Add tokens used elsewhere (e.g. by a helper model's client) to this client's totals."""
+        with self._token_lock:
+            self.total_input_tokens += input_tokens
+            self.total_output_tokens += output_tokens
     
     def get_token_usage(self) -> Dict[str, int]:
         """Return total token usage statistics."""
@@ -96,8 +225,24 @@ class LLMClient:
             "total_tokens": self.total_input_tokens + self.total_output_tokens
         }
     
+    def pop_token_usage(self) -> Tuple[int, int, int]:
+        """
+        Return (input, output, total) tokens and reset the counters.
+        
+        Reading and resetting happen under one lock, so no call made in
+        between is lost.
+        """
+        with self._token_lock:
+            input_tokens = self.total_input_tokens
+            output_tokens = self.total_output_tokens
+            self.total_input_tokens = 0
+            self.total_output_tokens = 0
+            self.call_count = 0
+        return input_tokens, output_tokens, input_tokens + output_tokens
+    
     def reset_token_count(self):
         """Reset token counters."""
-        self.total_input_tokens = 0
-        self.total_output_tokens = 0
-        self.call_count = 0
+        with self._token_lock:
+            self.total_input_tokens = 0
+            self.total_output_tokens = 0
+            self.call_count = 0
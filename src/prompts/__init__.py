@@ -5,6 +5,7 @@ Provides environment-specific prompts for different datasets.
 
 from .prompt_manager import (
     PromptManager,
+    get_prompt_manager,
     get_zipact_prompts,
     get_react_prompts,
 )
@@ -17,6 +18,7 @@ from .zipact_prompts import (
     ALFWORLD_ZIPACT_UPDATER_SYSTEM_PROMPT,
     ALFWORLD_ZIPACT_ACTOR_SYSTEM_PROMPT,
     ALFWORLD_ZIPACT_INIT_STATE_PROMPT,
+    ZIPACT_COMBINED_SYSTEM_TEMPLATE,
 )
 
 from .react_prompts import (
@@ -47,12 +49,14 @@ from .webshop_prompts import (
 __all__ = [
     # Manager
     "PromptManager",
+    "get_prompt_manager",
     "get_zipact_prompts",
     "get_react_prompts",
     # ALFWorld (default)
     "ZIPACT_UPDATER_SYSTEM_PROMPT",
     "ZIPACT_ACTOR_SYSTEM_PROMPT",
     "ZIPACT_INIT_STATE_PROMPT",
+    "ZIPACT_COMBINED_SYSTEM_TEMPLATE",
     "REACT_SYSTEM_PROMPT",
     "REACT_INSTRUCTION_TEMPLATE",
     # ALFWorld explicit
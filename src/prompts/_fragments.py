@@ -0,0 +1,26 @@
+"""
+Prompt text shared verbatim by several agents' prompts.
+
+Keeping one copy guarantees the agents see byte-identical wording, so an
+edit reaches every prompt that uses the fragment.
+"""
+
+# ALFWorld action list (ReAct system prompt and ZipAct actor prompt)
+ALFWORLD_ACTIONS = """## Available Actions
+
+**Navigation**: go to <receptacle/location>
+**Manipulation**:
+  - take <object> from <receptacle>
+  - put <object> in/on <receptacle>
+  - open <receptacle>
+  - close <receptacle>
+**Object Processing**:
+  - clean <object> with <receptacle> (e.g., sinkbasin)
+  - heat <object> with <receptacle> (e.g., microwave)
+  - cool <object> with <receptacle> (e.g., fridge)
+  - toggle <object> (turn on/off)
+  - use <object>
+**Perception**:
+  - look (examine current location)
+  - inventory (check what you're holding)
+"""
@@ -8,13 +8,17 @@ Supported environments:
 - WebShop: E-commerce navigation (search, browse, purchase)
 """
 
-from typing import Dict, Tuple
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
 
 # Import all environment-specific prompts
 from .zipact_prompts import (
     ALFWORLD_ZIPACT_UPDATER_SYSTEM_PROMPT,
     ALFWORLD_ZIPACT_ACTOR_SYSTEM_PROMPT,
     ALFWORLD_ZIPACT_INIT_STATE_PROMPT,
+    ZIPACT_COMBINED_SYSTEM_TEMPLATE,
 )
 
 from .react_prompts import (
@@ -39,6 +43,32 @@ from .webshop_prompts import (
 )
 
 
+# One worked example of an actor prompt's "## Examples" section, with the
+# blank line after it
+_EXAMPLE_RE = re.compile(r"\*\*Example \d+:.*?```\n.*?```\n\n", re.DOTALL)
+
+
+def _limit_examples(prompt: str, max_examples: int) -> str:
+    """Keep the first max_examples worked examples of prompt (0 drops the section)."""
+    head, section, rest = prompt.partition("## Examples\n\n")
+    if not section:
+        return prompt
+    examples = _EXAMPLE_RE.findall(rest)
+    tail = _EXAMPLE_RE.sub("", rest)
+    if max_examples <= 0:
+        return head + tail
+    return head + section + "".join(examples[:max_examples]) + tail
+
+
+# An updater prompt's "## Output Format" section: the state JSON skeleton
+_STATE_SKELETON_RE = re.compile(r"## Output Format\n.*?```json\n.*?\n```\n", re.DOTALL)
+
+# Replaces the skeleton when the updater's previous state shows the structure
+_STATE_FORMAT_NOTE = """## Output Format
+Output ONLY the updated state as a JSON object, with the same sections and keys as the Previous State.
+"""
+
+
 class PromptManager:
     """
     Manages prompts for different environments and agent types.
@@ -86,6 +116,12 @@ class PromptManager:
         }
     }
     
+    # Prompt tables are shared by every caller, so they are read-only views
+    for _agents in PROMPTS.values():
+        for _agent_type in _agents:
+            _agents[_agent_type] = MappingProxyType(_agents[_agent_type])
+    del _agents, _agent_type
+    
     # Environment aliases
     ENV_ALIASES = {
         "alf": "alfworld",
@@ -97,6 +133,15 @@ class PromptManager:
         "webshop": "webshop",
     }
     
+    @classmethod
+    def _resolve_env(cls, environment: str) -> str:
+        """Canonical environment name for environment (unchecked)."""
+        if environment in cls.PROMPTS:
+            # Already canonical, the usual case
+            return environment
+        env_lower = environment.lower()
+        return cls.ENV_ALIASES.get(env_lower, env_lower)
+    
     def __init__(self, environment: str = "alfworld"):
         """
         Initialize PromptManager for a specific environment.
@@ -104,42 +149,63 @@ class PromptManager:
         Args:
             environment: Environment name ('alfworld', 'sciworld', 'webshop')
         """
-        env_lower = environment.lower()
-        self.environment = self.ENV_ALIASES.get(env_lower, env_lower)
+        self.environment = self._resolve_env(environment)
         
         if self.environment not in self.PROMPTS:
             raise ValueError(
                 f"Unknown environment: {environment}. "
                 f"Supported: {list(self.PROMPTS.keys())}"
             )
+        
+        # This environment's prompt tables, resolved once for the getters
+        self._zipact = self.PROMPTS[self.environment]["zipact"]
+        self._react = self.PROMPTS[self.environment]["react"]
+    
+    def get_zipact_prompts(self) -> Mapping[str, str]:
+        """Get all ZipAct prompts for current environment (read-only; copy with dict() to modify)."""
+        return self._zipact
     
-    def get_zipact_prompts(self) -> Dict[str, str]:
-        """Get all ZipAct prompts for current environment."""
-        return self.PROMPTS[self.environment]["zipact"].copy()
+    def get_react_prompts(self) -> Mapping[str, str]:
+        """Get all ReAct prompts for current environment (read-only; copy with dict() to modify)."""
+        return self._react
     
-    def get_react_prompts(self) -> Dict[str, str]:
-        """Get all ReAct prompts for current environment."""
-        return self.PROMPTS[self.environment]["react"].copy()
+    def get_zipact_updater_prompt(self, state_skeleton: bool = True) -> str:
+        """
+        Get ZipAct State Updater system prompt. With state_skeleton=False,
+        its JSON skeleton of the state is replaced by a one-line format note
+        (every updater request already carries the previous state).
+        """
+        prompt = self._zipact["updater"]
+        if state_skeleton:
+            return prompt
+        return _STATE_SKELETON_RE.sub(lambda _: _STATE_FORMAT_NOTE, prompt, count=1)
     
-    def get_zipact_updater_prompt(self) -> str:
-        """Get ZipAct State Updater system prompt."""
-        return self.PROMPTS[self.environment]["zipact"]["updater"]
+    def get_zipact_actor_prompt(self, max_examples: Optional[int] = None) -> str:
+        """
+        Get ZipAct Actor system prompt, with only its first max_examples
+        worked examples if given.
+        """
+        prompt = self._zipact["actor"]
+        return prompt if max_examples is None else _limit_examples(prompt, max_examples)
     
-    def get_zipact_actor_prompt(self) -> str:
-        """Get ZipAct Actor system prompt."""
-        return self.PROMPTS[self.environment]["zipact"]["actor"]
+    def get_zipact_combined_prompt(self, max_examples: Optional[int] = None) -> str:
+        """Get ZipAct system prompt for one-call update + action steps."""
+        return ZIPACT_COMBINED_SYSTEM_TEMPLATE.format(
+            updater=self.get_zipact_updater_prompt(),
+            actor=self.get_zipact_actor_prompt(max_examples)
+        )
     
     def get_zipact_init_prompt(self) -> str:
         """Get ZipAct state initialization prompt template."""
-        return self.PROMPTS[self.environment]["zipact"]["init"]
+        return self._zipact["init"]
     
     def get_react_system_prompt(self) -> str:
         """Get ReAct system prompt."""
-        return self.PROMPTS[self.environment]["react"]["system"]
+        return self._react["system"]
     
     def get_react_template(self) -> str:
         """Get ReAct instruction template."""
-        return self.PROMPTS[self.environment]["react"]["template"]
+        return self._react["template"]
     
     @classmethod
     def list_environments(cls) -> list:
@@ -147,7 +213,7 @@ class PromptManager:
         return list(cls.PROMPTS.keys())
     
     @classmethod
-    def get_prompts_for_env(cls, environment: str, agent_type: str = "zipact") -> Dict[str, str]:
+    def get_prompts_for_env(cls, environment: str, agent_type: str = "zipact") -> Mapping[str, str]:
         """
         Static method to get prompts without instantiating.
         
@@ -156,19 +222,31 @@ class PromptManager:
             agent_type: 'zipact' or 'react'
             
         Returns:
-            Dict of prompts for the specified agent type
+            Read-only mapping of prompts for the specified agent type
         """
-        env_lower = environment.lower()
-        env = cls.ENV_ALIASES.get(env_lower, env_lower)
+        env = cls._resolve_env(environment)
         
         if env not in cls.PROMPTS:
             raise ValueError(f"Unknown environment: {environment}")
         if agent_type not in cls.PROMPTS[env]:
             raise ValueError(f"Unknown agent type: {agent_type}")
         
-        return cls.PROMPTS[env][agent_type].copy()
+        return cls.PROMPTS[env][agent_type]
+
+
+@lru_cache(maxsize=8)
+def get_prompt_manager(environment: str = "alfworld") -> PromptManager:
+    """
+    Shared PromptManager for an environment.
+    
+    A PromptManager holds no per-agent state, so agents created for a
+    batch run share one instance per environment name instead of building
+    their own.
+    """
+    return PromptManager(environment)
 
 
+@lru_cache(maxsize=16)
 def get_zipact_prompts(environment: str = "alfworld") -> Tuple[str, str, str]:
     """
     Convenience function to get ZipAct prompts.
@@ -179,7 +257,7 @@ def get_zipact_prompts(environment: str = "alfworld") -> Tuple[str, str, str]:
     Returns:
         Tuple of (updater_prompt, actor_prompt, init_prompt)
     """
-    pm = PromptManager(environment)
+    pm = get_prompt_manager(environment)
     return (
         pm.get_zipact_updater_prompt(),
         pm.get_zipact_actor_prompt(),
@@ -187,6 +265,7 @@ def get_zipact_prompts(environment: str = "alfworld") -> Tuple[str, str, str]:
     )
 
 
+@lru_cache(maxsize=16)
 def get_react_prompts(environment: str = "alfworld") -> Tuple[str, str]:
     """
     Convenience function to get ReAct prompts.
@@ -197,7 +276,7 @@ def get_react_prompts(environment: str = "alfworld") -> Tuple[str, str]:
     Returns:
         Tuple of (system_prompt, template)
     """
-    pm = PromptManager(environment)
+    pm = get_prompt_manager(environment)
     return (
         pm.get_react_system_prompt(),
         pm.get_react_template()
@@ -3,34 +3,19 @@ ALFWorld-specific prompts for ReAct agent.
 ALFWorld is a text-based household task environment.
 """
 
+from ._fragments import ALFWORLD_ACTIONS
+
 # =============================================================================
 # ReAct Prompts for ALFWorld
 # =============================================================================
 
-ALFWORLD_REACT_SYSTEM_PROMPT = """You are an intelligent agent that can interact with an environment to complete tasks. You will see the complete history of your interactions.
+ALFWORLD_REACT_SYSTEM_PROMPT = f"""You are an intelligent agent that can interact with an environment to complete tasks. You will see the complete history of your interactions.
 
 At each step, you should:
 1. Think about what to do next based on the task and what has happened
 2. Choose an action to execute
 
-## Available Actions
-
-**Navigation**: go to <receptacle/location>
-**Manipulation**: 
-  - take <object> from <receptacle>
-  - put <object> in/on <receptacle>
-  - open <receptacle>
-  - close <receptacle>
-**Object Processing**:
-  - clean <object> with <receptacle> (e.g., sinkbasin)
-  - heat <object> with <receptacle> (e.g., microwave)
-  - cool <object> with <receptacle> (e.g., fridge)
-  - toggle <object> (turn on/off)
-  - use <object>
-**Perception**: 
-  - look (examine current location)
-  - inventory (check what you're holding)
-
+{ALFWORLD_ACTIONS}
 ## Output Format
 
 You MUST respond in this format:
@@ -121,7 +121,7 @@ WEBSHOP_ZIPACT_ACTOR_SYSTEM_PROMPT = """You are the Actor for a web shopping age
 
 **Common Clickable Elements**:
   - Product names/titles
-  - "Back to Search" 
+  - "Back to Search"
   - Size options (e.g., "small", "medium", "large")
   - Color options (e.g., "red", "blue")
   - "Buy Now" button
@@ -3,6 +3,8 @@ ALFWorld-specific prompts for ZipAct agent.
 ALFWorld is a text-based household task environment.
 """
 
+from ._fragments import ALFWORLD_ACTIONS
+
 # =============================================================================
 # ZipAct Prompts for ALFWorld
 # =============================================================================
@@ -79,7 +81,7 @@ Be concise and filter out irrelevant details. Only update what changed.
 """
 
 
-ALFWORLD_ZIPACT_ACTOR_SYSTEM_PROMPT = """You are the Actor for an intelligent agent. You make decisions based ONLY on the current structured state and immediate observation.
+ALFWORLD_ZIPACT_ACTOR_SYSTEM_PROMPT = f"""You are the Actor for an intelligent agent. You make decisions based ONLY on the current structured state and immediate observation.
 
 You do NOT have access to full interaction history. Instead, you have:
 - A compact **State Table** that summarizes what matters
@@ -103,24 +105,7 @@ You do NOT have access to full interaction history. Instead, you have:
 - visited_locations: Places already explored
 - attempted_actions: Actions already tried (avoid loops)
 
-## Available Actions
-
-**Navigation**: go to <receptacle/location>
-**Manipulation**: 
-  - take <object> from <receptacle>
-  - put <object> in/on <receptacle>
-  - open <receptacle>
-  - close <receptacle>
-**Object Processing**:
-  - clean <object> with <receptacle> (e.g., sinkbasin)
-  - heat <object> with <receptacle> (e.g., microwave)
-  - cool <object> with <receptacle> (e.g., fridge)
-  - toggle <object> (turn on/off)
-  - use <object>
-**Perception**: 
-  - look (examine current location)
-  - inventory (check what you're holding)
-
+{ALFWORLD_ACTIONS}
 ## Decision Protocol
 
 1. **Check current_objective** - What is your immediate goal?
@@ -196,6 +181,28 @@ Output the initial state in this JSON structure:
 Output ONLY the JSON, no other text.
 """
 
+# =============================================================================
+# Combined Updater + Actor (one call per step, any environment)
+# =============================================================================
+# Filled with an environment's updater and actor prompts by PromptManager
+ZIPACT_COMBINED_SYSTEM_TEMPLATE = """You are both the State Updater and the Actor for an intelligent agent. In one response you first update the structured state, then choose the next action from the updated state.
+
+# Part 1: State Updater
+
+{updater}
+
+# Part 2: Actor
+
+{actor}
+
+# Combined Output Format
+
+This format replaces the output formats of Part 1 and Part 2. Output ONLY this JSON:
+```json
+{{"state": <the full updated state>, "thought": "<brief reasoning>", "action": "<exact command>"}}
+```
+"""
+
 # =============================================================================
 # Backward Compatibility Aliases (default to ALFWorld)
 # =============================================================================
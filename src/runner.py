@@ -0,0 +1,205 @@
+"""
+Shared episode loop for the ZipAct runner scripts.
+"""
+
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Per-step verbose output, chosen once per episode so the step loop does
+# not branch on verbose for every line it would print
+def _print_step(step_num, obs, agent):
+    print(f"\n--- Step {step_num} ---")
+    print(f"Obs: {agent.truncate_obs(obs)}")
+
+
+def _print_action(action):
+    print(f"Action: {action}")
+
+
+def _no_trace(*args):
+    pass
+
+
+def run_episode(agent, env, max_steps=50, logger=None, episode_id=None, verbose=False):
+    """
+    Run a single episode.
+
+    Args:
+        agent: Agent instance (BaseAgent subclass)
+        env: Environment instance (BaseEnv subclass)
+        max_steps: Maximum steps before the episode is cut off
+        logger: Optional Logger for step/episode records
+        episode_id: Episode number used in logs and verbose output
+        verbose: Whether to print detailed execution logs
+
+    Returns:
+        (success, total_reward, steps)
+    """
+    obs, info = env.reset()
+    task = env.get_task()
+
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"EPISODE {episode_id if episode_id is not None else '?'}")
+        print(f"Task: {task}")
+        print(f"{'='*60}")
+
+    # Initialize agent
+    agent.reset(task)
+
+    # Start logging
+    if logger:
+        logger.start_episode(task, episode_id)
+
+    success = False
+    total_reward = 0
+    step = 0
+    trace_step, trace_action = (_print_step, _print_action) if verbose else (_no_trace, _no_trace)
+
+    # Bind per-step methods once instead of looking them up every step
+    agent_step = agent.step
+    agent_thought = agent.get_last_thought
+    agent_state = agent.get_state
+    env_step = env.step
+    log_step = logger.log_step if logger else None
+    env_commands = getattr(env, "get_admissible_commands", None)
+    set_commands = agent.set_admissible_commands if env_commands and agent.wants_admissible_commands() else None
+
+    for step in range(max_steps):
+        trace_step(step + 1, obs, agent)
+
+        # Valid commands for guided decoding, if the agent uses them
+        if set_commands:
+            set_commands(env_commands())
+
+        # Agent decides action
+        action = agent_step(obs)
+
+        # Get thought for logging
+        thought = agent_thought()
+
+        # Log step
+        if log_step:
+            log_step(step + 1, obs, thought, action, agent_state())
+
+        trace_action(action)
+
+        # Execute action
+        obs, reward, done, info = env_step(action)
+        total_reward += reward
+
+        if done:
+            success = reward > 0
+            if verbose:
+                print(f"\n{'='*60}")
+                print(f"Episode finished: {'SUCCESS' if success else 'FAILURE'}")
+                print(f"Reward: {reward}")
+                print(f"Steps: {step + 1}")
+                print(f"{'='*60}")
+            break
+
+    # Agent-specific post-episode work (e.g. Reflexion's self-reflection)
+    agent.on_episode_end(success, step + 1, max_steps)
+
+    return success, total_reward, step + 1
+
+
+def warm_prefix_cache(agent):
+    """
+    Send each of agent's system prompts once with a 1-token reply, so a
+    server with automatic prefix caching (vLLM, SGLang, OpenAI) has the
+    shared prefixes cached before concurrent episodes all prefill them.
+    The prompts are independent, so they are sent concurrently.
+    
+    The warm-up calls are not part of any episode, so the agent's token
+    counters are reset afterwards.
+    """
+    agent.llm.chat_many(
+        [
+            [{"role": "system", "content": prompt}, {"role": "user", "content": "Reply OK."}]
+            for prompt in dict.fromkeys(agent.get_system_prompts())
+        ],
+        temperature=0.0,
+        max_tokens=1
+    )
+    agent.llm.reset_token_count()
+
+
+def run_episodes(agents, envs, num_episodes, max_steps=50, logger=None, verbose=False, on_result=None,
+                 warm_prefix=False):
+    """
+    Run episodes over a pool of (agent, env) workers.
+
+    Each worker pair runs one episode at a time, so with a single pair this
+    is the plain sequential loop. With N pairs, up to N episodes run
+    concurrently on threads; the time is spent waiting on LLM calls, so
+    threads overlap that latency. Every agent should own its LLM client so
+    token usage can be attributed per episode.
+
+    Args:
+        agents: List of agent instances, one per worker
+        envs: List of environment instances, same length as agents
+        num_episodes: Number of episodes to run
+        max_steps: Maximum steps per episode
+        logger: Optional Logger (thread-safe)
+        verbose: Whether to print detailed execution logs
+        on_result: Optional callback(episode_id, success, reward, steps, token_usage),
+            called as each episode finishes
+        warm_prefix: Warm the server's prefix cache with the agents' system
+            prompts before the first episodes start (see warm_prefix_cache)
+
+    Returns:
+        List of (episode_id, success, reward, steps, token_usage), ordered by episode_id
+    """
+    if len(agents) != len(envs) or not agents:
+        raise ValueError("agents and envs must be non-empty lists of equal length")
+
+    if warm_prefix:
+        warm_prefix_cache(agents[0])
+    
+    # Free workers; a worker is checked out for the duration of one episode
+    pool = queue.Queue()
+    for worker in zip(agents, envs):
+        pool.put(worker)
+
+    def _run(episode_id):
+        agent, env = pool.get()
+        try:
+            success, reward, steps = run_episode(
+                agent, env,
+                max_steps=max_steps,
+                logger=logger,
+                episode_id=episode_id,
+                verbose=verbose
+            )
+            input_tokens, output_tokens, total_tokens = agent.llm.pop_token_usage()
+            token_usage = {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": total_tokens
+            }
+            if logger:
+                logger.end_episode(success, reward, token_usage)
+            return episode_id, success, reward, steps, token_usage
+        finally:
+            pool.put((agent, env))
+
+    results = []
+    if len(agents) == 1:
+        for i in range(num_episodes):
+            result = _run(i + 1)
+            results.append(result)
+            if on_result:
+                on_result(*result)
+    else:
+        with ThreadPoolExecutor(max_workers=len(agents)) as ex:
+            futures = [ex.submit(_run, i + 1) for i in range(num_episodes)]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(*result)
+
+    results.sort(key=lambda r: r[0])
+    return results
@@ -1,10 +1,50 @@
-import json
 import os
+import threading
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any
+
+from .json_utils import dumps
+
+# Shared default for summaries without token_usage (never mutated)
+_EMPTY_TU: Dict[str, int] = {}
+
+
+@dataclass
+class EpisodeStats:
+    """Running totals over finished episodes, updated as each one ends."""
+    __slots__ = ("n", "n_success", "sum_steps", "sum_reward", "sum_input_tokens", "sum_output_tokens")
+    n: int
+    n_success: int
+    sum_steps: int
+    sum_reward: float
+    sum_input_tokens: int
+    sum_output_tokens: int
+
 
 class Logger:
-    """Logger for tracking agent execution and evaluation metrics."""
+    """
+    Logger for tracking agent execution and evaluation metrics.
+    
+    Rows are streamed to the JSONL log as they happen: one "step" row per
+    step and one "episode" row when the episode ends (both carry the
+    episode_id). Summary statistics come from running totals, so memory
+    use does not grow with the number of steps or episodes.
+    
+    Thread-safe: each thread has its own current episode, so concurrent
+    episodes (one per worker thread) can be logged through one Logger.
+    """
+    
+    __slots__ = (
+        "log_dir",
+        "experiment_name",
+        "log_file",
+        "summary_file",
+        "stats",
+        "_fh",
+        "_local",
+        "_lock",
+    )
     
     def __init__(self, log_dir: str = "logs", experiment_name: str = None):
         self.log_dir = log_dir
@@ -17,15 +57,37 @@ class Logger:
         self.log_file = os.path.join(log_dir, f"{experiment_name}.jsonl")
         self.summary_file = os.path.join(log_dir, f"{experiment_name}_summary.json")
         
-        self.episodes = []
-        self.current_episode = None
+        # Running totals for the summary
+        self.stats = EpisodeStats(
+            n=0, n_success=0, sum_steps=0, sum_reward=0.0,
+            sum_input_tokens=0, sum_output_tokens=0
+        )
+        
+        self._fh = open(self.log_file, "ab", buffering=1 << 20)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    @property
+    def current_episode(self) -> Dict:
+        """Episode being logged by the calling thread (None if none)."""
+        return getattr(self._local, "episode", None)
+    
+    @current_episode.setter
+    def current_episode(self, episode: Dict):
+        self._local.episode = episode
+    
+    def _write(self, row: Dict[str, Any]):
+        """Append one row to the JSONL log."""
+        line = dumps(row) + b"\n"
+        with self._lock:
+            self._fh.write(line)
     
     def start_episode(self, task: str, episode_id: int = None):
         """Start logging a new episode."""
         self.current_episode = {
+            "type": "episode",
             "episode_id": episode_id,
             "task": task,
-            "steps": [],
             "start_time": datetime.now().isoformat(),
             "success": False,
             "reward": 0,
@@ -39,6 +101,8 @@ class Logger:
             return
         
         step_data = {
+            "type": "step",
+            "episode_id": self.current_episode["episode_id"],
             "step": step_num,
             "observation": observation,
             "thought": thought,
@@ -48,40 +112,55 @@ class Logger:
         if state:
             step_data["state"] = state
         
-        self.current_episode["steps"].append(step_data)
+        self._write(step_data)
+        self.current_episode["num_steps"] += 1
     
     def end_episode(self, success: bool, reward: float, token_usage: Dict[str, int]):
         """End the current episode and save results."""
-        if self.current_episode is None:
+        episode = self.current_episode
+        if episode is None:
             return
         
-        self.current_episode["success"] = success
-        self.current_episode["reward"] = reward
-        self.current_episode["num_steps"] = len(self.current_episode["steps"])
-        self.current_episode["token_usage"] = token_usage
-        self.current_episode["end_time"] = datetime.now().isoformat()
-        
-        # Save to JSONL
-        with open(self.log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(self.current_episode, ensure_ascii=False) + "\n")
-        
-        self.episodes.append(self.current_episode)
+        episode["success"] = success
+        episode["reward"] = reward
+        episode["token_usage"] = token_usage
+        episode["end_time"] = datetime.now().isoformat()
+        
+        line = dumps(episode) + b"\n"
+        with self._lock:
+            self._fh.write(line)
+            # Flush per episode so an interrupted run keeps finished episodes
+            self._fh.flush()
+            stats = self.stats
+            stats.n += 1
+            stats.n_success += int(success)
+            stats.sum_steps += episode["num_steps"]
+            stats.sum_reward += reward
+            stats.sum_input_tokens += token_usage.get("input_tokens", 0)
+            stats.sum_output_tokens += token_usage.get("output_tokens", 0)
         self.current_episode = None
     
+    def close(self):
+        """Flush and close the JSONL log."""
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+    
     def save_summary(self, agent_name: str, model_name: str, dataset_name: str):
         """Save summary statistics."""
-        if not self.episodes:
+        stats = self.stats
+        if not stats.n:
             return
         
-        total_episodes = len(self.episodes)
-        successful_episodes = sum(1 for ep in self.episodes if ep["success"])
+        total_episodes = stats.n
+        successful_episodes = stats.n_success
         success_rate = successful_episodes / total_episodes if total_episodes > 0 else 0
         
-        avg_steps = sum(ep["num_steps"] for ep in self.episodes) / total_episodes
-        avg_reward = sum(ep["reward"] for ep in self.episodes) / total_episodes
+        avg_steps = stats.sum_steps / total_episodes
+        avg_reward = stats.sum_reward / total_episodes
         
-        total_input_tokens = sum(ep["token_usage"].get("input_tokens", 0) for ep in self.episodes)
-        total_output_tokens = sum(ep["token_usage"].get("output_tokens", 0) for ep in self.episodes)
+        total_input_tokens = stats.sum_input_tokens
+        total_output_tokens = stats.sum_output_tokens
         total_tokens = total_input_tokens + total_output_tokens
         
         summary = {
@@ -102,14 +181,14 @@ class Logger:
             }
         }
         
-        with open(self.summary_file, "w", encoding="utf-8") as f:
-            json.dump(summary, f, indent=2, ensure_ascii=False)
+        with open(self.summary_file, "wb") as f:
+            f.write(dumps(summary, indent=True))
         
         return summary
     
     def print_summary(self, summary: Dict = None):
         """Print summary statistics."""
-        if summary is None and self.episodes:
+        if summary is None and self.stats.n:
             summary = self.save_summary("unknown", "unknown", "unknown")
         
         if summary:
@@ -122,6 +201,7 @@ class Logger:
             print(f"Success Rate: {summary.get('success_rate', 0):.2%} ({summary.get('successful_episodes', 0)}/{summary.get('total_episodes', 0)})")
             print(f"Avg Steps: {summary.get('avg_steps', 0):.2f}")
             print(f"Avg Reward: {summary.get('avg_reward', 0):.2f}")
-            print(f"Total Tokens: {summary.get('token_usage', {}).get('total_tokens', 0):,}")
-            print(f"Avg Tokens/Episode: {summary.get('token_usage', {}).get('avg_tokens_per_episode', 0):.0f}")
+            token_usage = summary.get("token_usage") or _EMPTY_TU
+            print(f"Total Tokens: {token_usage.get('total_tokens', 0):,}")
+            print(f"Avg Tokens/Episode: {token_usage.get('avg_tokens_per_episode', 0):.0f}")
             print("="*50 + "\n")